@@ -1,6 +1,11 @@
+from collections.abc import MutableSequence
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from typing import Annotated, Union, List, Literal
-from pydantic import BaseModel, Field
+from functools import cache
+from typing import Annotated, Any, Iterable, Iterator, TextIO, Union, List, Literal
+from pydantic import Field, GetCoreSchemaHandler, TypeAdapter
+from pydantic_core import core_schema
+from profiling import ParseStats
 
 
 class NodeType(str, Enum):
@@ -20,23 +25,186 @@ class NodeType(str, Enum):
 
 
 
-class Node(BaseModel):
+# Nodes are plain slotted dataclasses so building them runs no validation.
+# Pydantic only gets involved at the Schema boundary (to_json, from_json,
+# validate), through a TypeAdapter built from these same annotations.
+@dataclass(slots=True, kw_only=True)
+class Node:
     type: NodeType
 
+    # Large nodes override iter_sql to produce their SQL in pieces and build
+    # sql() from it; the rest stream their sql() as a single chunk
+    def iter_sql(self) -> Iterator[str]:
+        yield self.sql()
+
+    def write_sql(self, fp: TextIO):
+        fp.writelines(self.iter_sql())
+
+@dataclass(slots=True, kw_only=True)
 class Table(Node):
     type: Literal[NodeType.TABLE] = NodeType.TABLE
     name: str = ""
 
+@dataclass(slots=True, kw_only=True)
 class ValueLiteral(Node):
     type: Literal[NodeType.LITERAL] = NodeType.LITERAL
     value: str
 
 
+class RowLiteral(ValueLiteral):
+    # A cell read out of ValueRows. It is a copy of the stored text, so it
+    # refuses writes instead of silently dropping them; rows are replaced
+    # through ValueRows itself.
+    __slots__ = ()
+
+    def __init__(self, value: str, type: NodeType = NodeType.LITERAL):
+        object.__setattr__(self, 'type', type)
+        object.__setattr__(self, 'value', value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("INSERT cells are read-only; assign the whole row through Insert.values")
+
+    def __reduce__(self):
+        return (RowLiteral, (self.value,))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ValueLiteral):
+            return NotImplemented
+        return self.value == other.value
+
+
+class ValueRows(MutableSequence):
+    # Row-major raw literal text of an INSERT's VALUES. Cells stay the token
+    # strings; nodes are only built when a row is read through indexing or
+    # iteration. Rows read that way are tuples of read-only RowLiterals, and
+    # changes go through the list-style row API (values[i] = row, slicing,
+    # del, insert, append, extend), which takes ValueLiterals or raw text.
+    __slots__ = ('cells', 'width')
+
+    def __init__(self, cells: list[str] | None = None, width: int = 0):
+        self.cells = cells if cells is not None else []
+        self.width = width
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable[Any]]) -> 'ValueRows':
+        if isinstance(rows, ValueRows):
+            return rows
+        cells: list[str] = []
+        width = None
+        for row in rows:
+            row_cells = [cell_text(cell) for cell in row]
+            if width is None:
+                width = len(row_cells)
+            elif len(row_cells) != width:
+                raise ValueError("All value rows must have the same length")
+            cells.extend(row_cells)
+        return cls(cells, width or 0)
+
+    def __len__(self) -> int:
+        return len(self.cells) // self.width if self.width else 0
+
+    def __getitem__(self, index: int | slice) -> tuple[RowLiteral, ...] | list[tuple[RowLiteral, ...]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return tuple([RowLiteral(cell) for cell in self.row(self.row_index(index))])
+
+    def __setitem__(self, index: int | slice, row: Iterable[Any]):
+        if isinstance(index, slice):
+            rows = list(self.iter_rows())
+            rows[index] = row
+            self.set_rows(rows)
+            return
+        start = self.row_index(index) * self.width
+        self.cells[start:start + self.width] = self.row_cells(row)
+
+    def __delitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            rows = list(self.iter_rows())
+            del rows[index]
+            self.set_rows(rows)
+            return
+        start = self.row_index(index) * self.width
+        del self.cells[start:start + self.width]
+
+    def insert(self, index: int, row: Iterable[Any]):
+        row_cells = self.row_cells(row)
+        # list.insert semantics: out of range indexes clamp to the ends
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        start = index * self.width
+        self.cells[start:start] = row_cells
+
+    def __iter__(self) -> Iterator[tuple[RowLiteral, ...]]:
+        for row in self.iter_rows():
+            yield tuple([RowLiteral(cell) for cell in row])
+
+    def row_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("value row index out of range")
+        return index
+
+    def row_cells(self, row: Iterable[Any]) -> list[str]:
+        row_cells = [cell_text(cell) for cell in row]
+        if not self.cells and not self.width:
+            self.width = len(row_cells)
+        elif len(row_cells) != self.width:
+            raise ValueError("All value rows must have the same length")
+        return row_cells
+
+    def set_rows(self, rows: Iterable[Iterable[Any]]):
+        replaced = ValueRows.from_rows(rows)
+        self.cells = replaced.cells
+        self.width = replaced.width if replaced.cells else self.width
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ValueRows):
+            return NotImplemented
+        return self.width == other.width and self.cells == other.cells
+
+    def __repr__(self) -> str:
+        return f"ValueRows(rows={len(self)}, width={self.width})"
+
+    def row(self, index: int) -> list[str]:
+        start = index * self.width
+        return self.cells[start:start + self.width]
+
+    def column(self, index: int) -> list[str]:
+        return self.cells[index::self.width]
+
+    def iter_rows(self) -> Iterator[list[str]]:
+        width = self.width
+        cells = self.cells
+        for start in range(0, len(cells), width or 1):
+            yield cells[start:start + width]
+
+    def dump_rows(self) -> list[list[dict[str, str]]]:
+        return [
+            [{"type": NodeType.LITERAL.value, "value": cell} for cell in row]
+            for row in self.iter_rows()
+        ]
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.from_rows,
+            serialization=core_schema.plain_serializer_function_ser_schema(cls.dump_rows),
+        )
+
+def cell_text(cell: Any) -> str:
+    if isinstance(cell, ValueLiteral):
+        return cell.value
+    if isinstance(cell, dict):
+        return cell["value"]
+    return cell
+
+
+@dataclass(slots=True, kw_only=True)
 class ColumnDef(Node):
     type: Literal[NodeType.COLUMN_DEF] = NodeType.COLUMN_DEF
     name: str = ""
     datatype: str = ""
-    constraints: List[str] = Field(default_factory=list)
+    constraints: List[str] = field(default_factory=list)
 
     def sql(self) -> str:
         constraint_str = " ".join(self.constraints)
@@ -44,6 +212,7 @@ class ColumnDef(Node):
             return f'{self.name} {self.datatype} {constraint_str}'
         return f'{self.name} {self.datatype}'
 
+@dataclass(slots=True, kw_only=True)
 class UpdateCondition(Node):
     type: Literal[NodeType.UPDATE_CONDITION] = NodeType.UPDATE_CONDITION
     column: str = ""
@@ -53,31 +222,39 @@ class UpdateCondition(Node):
     def sql(self) -> str:
         return f"{self.column} {self.operator} {self.value.value}" 
 
+@dataclass(slots=True, kw_only=True)
 class Insert(Node):
     type: Literal[NodeType.INSERT] = NodeType.INSERT
     table_name: str = ""
-    columns: List[str] = Field(default_factory=list)
-    values: List[List[ValueLiteral]] = Field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+    values: ValueRows = field(default_factory=ValueRows)
+
+    def __post_init__(self):
+        # rows may also be given as nested lists of ValueLiteral or raw text
+        self.values = ValueRows.from_rows(self.values)
 
     def sql(self) -> str:
-        columns_str = ", ".join(self.columns)
-        value_strings = []
-        for value_list in self.values:
-            value_string = "("
-            value_string += ", ".join([val.value for val in value_list ]) + ")"
-            value_strings.append(value_string)
-        full_value_string = ",\n".join(value_strings)
+        return "".join(self.iter_sql())
+
+    def iter_sql(self) -> Iterator[str]:
         if self.columns:
-            return f"INSERT INTO {self.table_name} ({columns_str}) VALUES\n{full_value_string};"
+            columns_str = ", ".join(self.columns)
+            yield f"INSERT INTO {self.table_name} ({columns_str}) VALUES\n"
         else:
-            return f"INSERT INTO {self.table_name} VALUES\n{full_value_string};"
-
+            yield f"INSERT INTO {self.table_name} VALUES\n"
+        separator = ""
+        for value_list in self.values.iter_rows():
+            yield f"{separator}({', '.join(value_list)})"
+            separator = ",\n"
+        yield ";"
+
+@dataclass(slots=True, kw_only=True)
 class Update(Node):
     type: Literal[NodeType.UPDATE] = NodeType.UPDATE
     table_name: str = ""
-    columns: List[str] = Field(default_factory=list)
-    values: List[ValueLiteral] = Field(default_factory=list)
-    conditions: List[UpdateCondition] = Field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+    values: List[ValueLiteral] = field(default_factory=list)
+    conditions: List[UpdateCondition] = field(default_factory=list)
 
     def sql(self) -> str:
         # Create the SET clause by pairing columns with their values
@@ -96,6 +273,7 @@ class Update(Node):
         
         return f"{sql};"
 
+@dataclass(slots=True, kw_only=True)
 class PrimaryKeyConstraint(Node):
     type: Literal[NodeType.CONSTRAINT] = NodeType.CONSTRAINT
     column_name: str
@@ -103,6 +281,7 @@ class PrimaryKeyConstraint(Node):
     def sql(self) -> str:
         return f"PRIMARY KEY ({self.column_name})"
 
+@dataclass(slots=True, kw_only=True)
 class ForeignKeyConstraint(Node):
     type: Literal[NodeType.CONSTRAINT] = NodeType.CONSTRAINT
     name: str | None
@@ -113,30 +292,38 @@ class ForeignKeyConstraint(Node):
     def sql(self) -> str:
         return f"CONSTRAINT {self.name} FOREIGN KEY ({self.column_name}) REFERENCES {self.referenced_table} ({self.referenced_column})"
 
+@dataclass(slots=True, kw_only=True)
 class CreateTable(Node):
     type: Literal[NodeType.CREATE_TABLE] = NodeType.CREATE_TABLE
     table: Table
-    columns: List[ColumnDef] = Field(default_factory=list)
-    condition_clauses: List[str] = Field(default_factory=list)
-    table_constraints: List[ForeignKeyConstraint | PrimaryKeyConstraint] = Field(default_factory=list)
+    columns: List[ColumnDef] = field(default_factory=list)
+    condition_clauses: List[str] = field(default_factory=list)
+    table_constraints: List[ForeignKeyConstraint | PrimaryKeyConstraint] = field(default_factory=list)
 
 
     def sql(self) -> str:
+        return "".join(self.iter_sql())
+
+    def iter_sql(self) -> Iterator[str]:
         sql = 'CREATE TABLE '
         if self.condition_clauses:
             conditions = ' '.join(self.condition_clauses)
             sql += f'{conditions} '
-            
-        sql += f'{self.table.name} (\n'
-        column_str = ",\n".join([' ' + col.sql() for col in self.columns])
-        sql += column_str
-        if self.table_constraints:
-            sql += ",\n"
-            constraint_str = ",\n".join([' ' + constraint.sql() for constraint in self.table_constraints])
-            sql += constraint_str
-        sql += "\n);"
-        return sql
+        yield f'{sql}{self.table.name} (\n'
 
+        separator = ""
+        for col in self.columns:
+            yield f'{separator} {col.sql()}'
+            separator = ",\n"
+        if self.table_constraints:
+            yield ",\n"
+            separator = ""
+            for constraint in self.table_constraints:
+                yield f'{separator} {constraint.sql()}'
+                separator = ",\n"
+        yield "\n);"
+
+@dataclass(slots=True, kw_only=True)
 class AlterOperation(Node):
     type: Literal[NodeType.ALTER_OPERATION] = NodeType.ALTER_OPERATION
     action: str
@@ -152,92 +339,183 @@ class AlterOperation(Node):
         else:
             return f'{self.action} COLUMN {self.column.name}'
 
+@dataclass(slots=True, kw_only=True)
 class AlterTable(Node):
     type: Literal[NodeType.ALTER_TABLE] = NodeType.ALTER_TABLE
     table: Table
-    operations: List[AlterOperation] = Field(default_factory=list)
+    operations: List[AlterOperation] = field(default_factory=list)
+
+    def sql(self) -> str:
+        return "".join(self.iter_sql())
+
+    def iter_sql(self) -> Iterator[str]:
+        yield f'ALTER TABLE {self.table.name}\n'
+        separator = ""
+        for op in self.operations:
+            yield f'{separator}{op.sql()}'
+            separator = ",\n"
+        yield ";"
+
+
+
+class ColumnIndex:
+    # A table's columns in order, indexed by name so ADD and DROP are O(1).
+    # Repeated names are kept, and a DROP removes all of them.
+    __slots__ = ('columns_by_slot', 'slots_by_name', 'next_slot')
+
+    def __init__(self, columns: Iterable[ColumnDef] = ()):
+        self.columns_by_slot: dict[int, ColumnDef] = {}
+        self.slots_by_name: dict[str, list[int]] = {}
+        self.next_slot = 0
+        for column in columns:
+            self.add(column)
+
+    def add(self, column: ColumnDef):
+        slot = self.next_slot
+        self.next_slot += 1
+        self.columns_by_slot[slot] = column
+        self.slots_by_name.setdefault(column.name, []).append(slot)
+
+    def drop(self, name: str):
+        for slot in self.slots_by_name.pop(name, ()):
+            del self.columns_by_slot[slot]
+
+    def columns(self) -> list[ColumnDef]:
+        return list(self.columns_by_slot.values())
+
+
+class SchemaFolder:
+    # Folds statements as they arrive, keeping one ColumnIndex per table.
+    # ALTERs on a table that hasn't been created yet wait until its CREATE
+    # TABLE shows up. A repeated CREATE TABLE starts the table over from its
+    # own columns. With keep_statements=False, INSERTs and UPDATEs are
+    # dropped so memory only grows with the tables themselves.
+    def __init__(self, keep_statements: bool = True):
+        self.keep_statements = keep_statements
+        self.create_tables: dict[str, CreateTable] = {}
+        self.column_indexes: dict[str, ColumnIndex] = {}
+        self.other_statements: list[Node] = []
+        self.pending_alters: list[AlterTable] = []
+        self.pending_tables: set[str] = set()
+
+    def apply(self, node: Node):
+        if node.type == NodeType.CREATE_TABLE:
+            table_name = node.table.name
+            index = ColumnIndex(node.columns)
+            self.create_tables[table_name] = node
+            self.column_indexes[table_name] = index
+            if table_name in self.pending_tables:
+                self.pending_tables.discard(table_name)
+                remaining_alters = []
+                for alter in self.pending_alters:
+                    if alter.table.name == table_name:
+                        fold_alter(index, alter)
+                    else:
+                        remaining_alters.append(alter)
+                self.pending_alters = remaining_alters
+        elif node.type == NodeType.ALTER_TABLE:
+            index = self.column_indexes.get(node.table.name)
+            if index is None:
+                self.pending_alters.append(node)
+                self.pending_tables.add(node.table.name)
+            else:
+                fold_alter(index, node)
+        elif self.keep_statements:
+            self.other_statements.append(node)
+
+    def schema(self) -> 'Schema':
+        # Folded tables are new CreateTable nodes, applied nodes are left untouched
+        folded_schema = Schema()
+        for table_name, create in self.create_tables.items():
+            folded_schema.body.append(replace(create, columns=self.column_indexes[table_name].columns()))
+        folded_schema.body.extend(self.other_statements)
+        folded_schema.body.extend(self.pending_alters)
+        return folded_schema
 
     def sql(self) -> str:
-        sql = f'ALTER TABLE {self.table.name}\n'
-        op_string = ",\n".join([op.sql() for op in self.operations])
+        return self.schema().sql()
+
+    def iter_sql(self) -> Iterator[str]:
+        return self.schema().iter_sql()
 
-        return sql + op_string + ";"
+    def write_sql(self, fp: TextIO):
+        self.schema().write_sql(fp)
 
+def fold_alter(index: ColumnIndex, alter: AlterTable):
+    for op in alter.operations:
+        if op.action == "ADD":
+            index.add(op.column)
+        if op.action == "DROP":
+            index.drop(op.column.name)
 
 
 BodyItem = Annotated[
-    Union[CreateTable, Table, ColumnDef, AlterTable], 
+    Union[CreateTable, Table, ColumnDef, AlterTable, Insert, Update], 
     Field(discriminator="type")
 ]
 
 
+@dataclass(slots=True, kw_only=True)
 class Schema(Node):
     type: Literal[NodeType.SCHEMA] = NodeType.SCHEMA
-    body: List[BodyItem] = Field(default_factory=list)
+    body: List[BodyItem] = field(default_factory=list)
 
 
-    def fold(self) -> 'Schema':
+    def fold(self, stats: ParseStats | None = None) -> 'Schema':
+        if stats is not None:
+            return stats.time('fold', self.fold_alter_statements)
         return self.fold_alter_statements()
     
     def fold_alter_statements(self) -> 'Schema':
-        create_tables = {}
-        other_statements  = []
-        alter_statements = []
-
-        for item in self.body: 
+        # Every CREATE TABLE goes in first so ALTERs fold into the table's
+        # last definition wherever they appear in the file
+        folder = SchemaFolder()
+        for item in self.body:
             if item.type == NodeType.CREATE_TABLE:
-                create_tables[item.table.name] = item
-            elif item.type == NodeType.ALTER_TABLE:
-                alter_statements.append(item)
-            else:
-                other_statements.append(item)
-
-        def fold_alter_into_creates(alter: AlterTable) -> bool:
-            table_name = alter.table.name
-            if table_name in create_tables:
-                for op in alter.operations:
-                    if op.action == "ADD":
-                        create_tables[table_name].columns.append(op.column)
-                    if op.action == "DROP":
-                        create_tables[table_name].columns = [
-                            col for col in create_tables[table_name].columns
-                            if col.name != op.column.name
-                        ]
-                return True
-            return False
-    
-        remaining_alters = []
-        for alter in alter_statements:
-            if not fold_alter_into_creates(alter):
-                remaining_alters.append(alter)
-
-        if remaining_alters and len(remaining_alters) < len(alter_statements):
-            temp_schema = Schema()
-            temp_schema = Schema()
-            temp_schema.body.extend(list(create_tables.values()))
-            temp_schema.body.extend(other_statements)
-            temp_schema.body.extend(remaining_alters)
-            return temp_schema.fold_alter_statements()
+                folder.apply(item)
+        for item in self.body:
+            if item.type != NodeType.CREATE_TABLE:
+                folder.apply(item)
+        return folder.schema()
 
-        folded_schema = Schema()
-        folded_schema.body.extend(list(create_tables.values()))
-        folded_schema.body.extend(other_statements)
-        folded_schema.body.extend(remaining_alters)
+    def to_json(self, indent: int | None = None) -> str:
+        return schema_adapter().dump_json(self, indent=indent).decode()
 
-        return folded_schema
+    @classmethod
+    def from_json(cls, data: str | bytes) -> 'Schema':
+        return schema_adapter().validate_json(data)
+
+    def to_bytes(self) -> bytes:
+        from serialization import dump_schema
+        return dump_schema(self)
+
+    @classmethod
+    def from_bytes(cls, data) -> 'Schema':
+        from serialization import load_schema
+        return load_schema(data)
+
+    def validate(self) -> 'Schema':
+        adapter = schema_adapter()
+        return adapter.validate_python(adapter.dump_python(self, warnings=False))
 
     def __str__(self) -> str:
-        return self.model_dump_json(indent=1)
+        return self.to_json(indent=1)
     
     def __repr__(self) -> str:
         return self.__str__()
     
-    def sql(self) -> str:
-        sql_statements = []
-        
+    def sql(self, stats: ParseStats | None = None) -> str:
+        if stats is not None:
+            return stats.time('sql', self.sql)
+        return "".join(self.iter_sql())
+
+    def iter_sql(self) -> Iterator[str]:
+        separator = ""
         for item in self.body:
             if hasattr(item, 'sql') and callable(getattr(item, 'sql')):
-                sql_statements.append(item.sql())
+                yield separator
+                yield from item.iter_sql()
+                separator = "\n\n"
             # Handle items that don't have sql method
             # elif item.type == NodeType.ALTER_TABLE:
             #     for op in item.operations:
@@ -245,10 +523,13 @@ class Schema(Node):
             #             table_name = item.table.name
             #             column_sql = op.column.sql()
             #             sql_statements.append(f"ALTER TABLE {table_name} ADD COLUMN {column_sql};")
-        
-        return "\n\n".join(sql_statements)
     
 
+@cache
+def schema_adapter() -> TypeAdapter[Schema]:
+    return TypeAdapter(Schema)
+
+
 # class Literal(Node):
 #     type: NodeType = NodeType.LITERAL
 #     value: str = None
\ No newline at end of file
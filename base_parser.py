@@ -1,138 +1,243 @@
 from lexer import TokenType, Token
-from typing import Any, Callable
-from pydantic import BaseModel
+from profiling import ParseStats, count_calls, time_rule
+from token_stream import TokenStream
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
 
-class ParseResult(BaseModel):
-    value: Any = None
-    is_optional: bool = False
+
+class Marker:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+# Rules return the matched value itself, FAIL when they don't match, or EMPTY
+# when an optional part is absent, so matching allocates no result objects
+FAIL = Marker('FAIL')
+EMPTY = Marker('EMPTY')
+
+# A rule is built once per parser class and receives the parser it runs against
+Rule = Callable[['BaseParser'], Any]
+
+
+def combinator(factory):
+    # Combinators are classmethods that build rules. While a class builds its
+    # profiled grammar, every rule they return is wrapped in a call counter;
+    # the plain grammar gets the bare rules.
+    def build(cls, *args, **kwargs):
+        parser = factory(cls, *args, **kwargs)
+        if cls._counting_combinators:
+            return count_calls(factory.__name__, parser)
+        return parser
+    return classmethod(build)
 
 
 class BaseParser:
-    tokens: list[Token] = []
+    stream: TokenStream
+    _counting_combinators = False
+
+    def __init__(self):
+        # (rule, start position) -> (result, end position)
+        self.memo_table: dict[tuple[Rule, int], tuple[Any, int]] = {}
+        self.stats: ParseStats | None = None
+
+    @classmethod
+    def grammar(cls) -> Mapping[str, Rule]:
+        grammar = cls.__dict__.get('_grammar')
+        if grammar is None:
+            grammar = MappingProxyType(cls.build_grammar())
+            cls._grammar = grammar
+        return grammar
+
+    @classmethod
+    def build_grammar(cls) -> dict[str, Rule]:
+        return {
+            'create_table': cls.create_table(),
+            'alter_table': cls.alter_table(),
+            'insert': cls.insert(),
+            'update': cls.update(),
+        }
 
-    def optional(self, parser):
-        def parser_fn():
-            result = parser()
-            if result.value is None:
-                return ParseResult(value=None, is_optional=True)
+    @classmethod
+    def profiled_grammar(cls) -> Mapping[str, Rule]:
+        grammar = cls.__dict__.get('_profiled_grammar')
+        if grammar is None:
+            cls._counting_combinators = True
+            try:
+                rules = cls.build_grammar()
+            finally:
+                cls._counting_combinators = False
+            grammar = MappingProxyType({name: time_rule(rule) for name, rule in rules.items()})
+            cls._profiled_grammar = grammar
+        return grammar
+
+    def rule(self, name: str) -> Any:
+        if self.stats is None:
+            return self.grammar()[name](self)
+        return self.profiled_grammar()[name](self)
+
+    @combinator
+    def memo(cls, parser: Rule) -> Rule:
+        def parser_fn(p):
+            key = (parser, p.stream.mark())
+            cached = p.memo_table.get(key)
+            if cached is not None:
+                result, end = cached
+                p.stream.rewind(end)
+                return result
+            result = parser(p)
+            p.memo_table[key] = (result, p.stream.mark())
+            return result
+        return parser_fn
+
+    @combinator
+    def optional(cls, parser: Rule) -> Rule:
+        def parser_fn(p):
+            start = p.stream.mark()
+            result = parser(p)
+            if result is FAIL or result is EMPTY:
+                p.stream.rewind(start)
+                return EMPTY
             return result
         return parser_fn
     
-    def choice(self, *parsers):
-        def parser_fn():
-            for p in parsers:
-                result = p()
-                if result.value is not None:
+    @combinator
+    def choice(cls, *parsers: Rule) -> Rule:
+        def parser_fn(p):
+            start = p.stream.mark()
+            for parser in parsers:
+                result = parser(p)
+                if result is not FAIL and result is not EMPTY:
                     return result
-            return ParseResult()
+                p.stream.rewind(start)
+            return FAIL
         return parser_fn
 
 
-    def label(self, name: str, parser: Callable[[], ParseResult]) -> Callable[[], ParseResult]:
-        def _p():
-            pr = parser()
-            if pr.value is None:
-                return pr
-            return ParseResult(value={name: pr.value}, is_optional=pr.is_optional)
+    @combinator
+    def label(cls, name: str, parser: Rule) -> Rule:
+        def _p(p):
+            result = parser(p)
+            if result is FAIL or result is EMPTY:
+                return result
+            return {name: result}
         return _p
 
-    def keyword(self, expected_word):
-        def parser():
-            if self.is_keyword() and self.curr_value() == expected_word:
-                result = self.curr_value()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def keyword(cls, expected_word) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.KEYWORD and token.value == expected_word:
+                p.stream.advance()
+                return token.value
+            return FAIL
         return parser
 
-    def identifier(self):
-        def parser():
-            if self.is_identifier():
-                result = self.curr_value()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def identifier(cls) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.IDENTIFIER:
+                p.stream.advance()
+                return token.value
+            return FAIL
         return parser
     
-    def literal(self):
-        def parser():
-            if self.is_literal():
-                result = self.curr_value()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def literal(cls) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.LITERAL:
+                p.stream.advance()
+                return token.value
+            return FAIL
         return parser
     
-    def token_type(self, expected_type):
-        def parser():
-            if self.curr_type() == expected_type:
-                result = self.curr_token()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def token_type(cls, expected_type) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == expected_type:
+                p.stream.advance()
+                return token
+            return FAIL
         return parser
     
-    def equals(self):
-        def parser():
-            if self.is_equals():
-                result = self.curr_token()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def equals(cls) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.EQUALS:
+                p.stream.advance()
+                return token
+            return FAIL
         return parser
 
-    def delimiter(self, expected_delimiter):
-        def parser():
-            if self.is_delimiter() and self.curr_value() == expected_delimiter:
-                result = self.curr_token()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def delimiter(cls, expected_delimiter) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.DELIMITER and token.value == expected_delimiter:
+                p.stream.advance()
+                return token
+            return FAIL
         return parser
     
-    def datatype(self):
-        def parser():
-            if self.is_datatype():
-                result = self.curr_token()
-                self.next()
-                return ParseResult(value=result)
-            return ParseResult()
+    @combinator
+    def datatype(cls) -> Rule:
+        def parser(p):
+            token = p.stream.curr()
+            if token.type == TokenType.DATATYPE:
+                p.stream.advance()
+                return token
+            return FAIL
         return parser
 
-    def sequence(self, *parsers):
+    @combinator
+    def sequence(cls, *parsers: Rule) -> Rule:
     
-        def parser():
+        def parser(p):
+            start = p.stream.mark()
             merged: dict[str, Any] = {}
             ordered: list[Any] = []
-            for p in parsers:
-                pr = p()
-                if pr.value is None and not pr.is_optional:
-                    return ParseResult()               
-                if pr.value is None:
+            for part in parsers:
+                result = part(p)
+                if result is FAIL:
+                    p.stream.rewind(start)
+                    return FAIL
+                if result is EMPTY:
                     continue                           
-                if isinstance(pr.value, dict):
-                    merged.update(pr.value)            
+                if isinstance(result, dict):
+                    merged.update(result)            
                 else:
-                    ordered.append(pr.value)           
-            return ParseResult(value=merged if merged else ordered)
+                    ordered.append(result)           
+            return merged if merged else ordered
         return parser
     
-    def many(self, parser, separator=None):
-        def parser_fn():
+    @combinator
+    def many(cls, parser: Rule, separator: Rule | None = None) -> Rule:
+        def parser_fn(p):
             results = []
             while True:
+                # a separator only counts if the item after it parses too
+                start = p.stream.mark()
                 if len(results) > 0 and separator is not None:
-                    sep_result = separator()
-                    if sep_result.value is None:
+                    if separator(p) is FAIL:
+                        p.stream.rewind(start)
                         break
 
-                result = parser()
-                if result.value is None:
+                result = parser(p)
+                if result is FAIL or result is EMPTY:
+                    p.stream.rewind(start)
                     break
                     
-                results.append(result.value)
+                results.append(result)
         
-            return ParseResult(value=results if results else None)
+            return results if results else FAIL
         return parser_fn
 
     def is_keyword(self) -> bool:
@@ -156,205 +261,210 @@ class BaseParser:
         return self.curr_type() == TokenType.DELIMITER
     
     def curr_value(self) -> str:
-        return self.tokens[0].value
+        return self.stream.curr().value
     
     def curr_type(self) -> TokenType:
-        return self.tokens[0].type
+        return self.stream.curr().type
         
     def curr_token(self) -> Token:
-        return self.tokens[0]
+        return self.stream.curr()
 
     def next(self) -> Token:
-        return self.tokens.pop(0)
-
-    def update(self):
-        return self.sequence(
-            self.keyword("UPDATE"),
-            self.label("table", self.identifier()),
-            self.keyword("SET"),
-            self.label("col", self.identifier()),
-            self.label("op", self.equals()),
-            self.label("value", self.literal()),
-            self.keyword("WHERE"),
-            self.label("conditions", self.many(
-                self.sequence(
-                    self.label("cond_col", self.identifier()),
-                    self.label("cond_op", self.equals()),
-                    self.label("cond_val", self.literal())
+        return self.stream.advance()
+
+    @classmethod
+    def update(cls) -> Rule:
+        return cls.sequence(
+            cls.keyword("UPDATE"),
+            cls.label("table", cls.identifier()),
+            cls.keyword("SET"),
+            cls.label("col", cls.identifier()),
+            cls.label("op", cls.equals()),
+            cls.label("value", cls.literal()),
+            cls.keyword("WHERE"),
+            cls.label("conditions", cls.many(
+                cls.sequence(
+                    cls.label("cond_col", cls.identifier()),
+                    cls.label("cond_op", cls.equals()),
+                    cls.label("cond_val", cls.literal())
                 ),
-                self.keyword("AND")
+                cls.keyword("AND")
             )),
-            self.delimiter(";")
+            cls.delimiter(";")
         )
-    def alter_table(self):
-        return self.sequence(
-            self.keyword("ALTER"),
-            self.keyword("TABLE"),
-            self.label("table_name", self.identifier()),
-            self.label("operations", self.many(
-                self.choice(
-                    self.sequence(
-                        self.label("action", self.keyword("ADD")),
-                        self.keyword("COLUMN"),
-                        self.column()
+    @classmethod
+    def alter_table(cls) -> Rule:
+        return cls.sequence(
+            cls.keyword("ALTER"),
+            cls.keyword("TABLE"),
+            cls.label("table_name", cls.identifier()),
+            cls.label("operations", cls.many(
+                cls.choice(
+                    cls.sequence(
+                        cls.label("action", cls.keyword("ADD")),
+                        cls.keyword("COLUMN"),
+                        cls.column()
                     ),
-                    self.sequence(
-                        self.label("action", self.keyword("DROP")),
-                        self.keyword("COLUMN"),
-                        self.label("column_name", self.identifier())
+                    cls.sequence(
+                        cls.label("action", cls.keyword("DROP")),
+                        cls.keyword("COLUMN"),
+                        cls.label("column_name", cls.identifier())
                     )
                 ),
-                self.delimiter(",")
+                cls.delimiter(",")
             )),
-            self.delimiter(";")
+            cls.delimiter(";")
         )
-    def create_table(self):
-        return self.sequence(
-            self.keyword("CREATE"),
-            self.keyword("TABLE"),
-            self.optional(
-                self.label(
+    @classmethod
+    def create_table(cls) -> Rule:
+        return cls.sequence(
+            cls.keyword("CREATE"),
+            cls.keyword("TABLE"),
+            cls.optional(
+                cls.label(
                     "conditional_clause",
-                    self.sequence(
-                        self.keyword("IF"),
-                        self.keyword("NOT"),
-                        self.keyword("EXISTS")
+                    cls.sequence(
+                        cls.keyword("IF"),
+                        cls.keyword("NOT"),
+                        cls.keyword("EXISTS")
                     )
                 )
             ),
-            self.label("table_name", self.identifier()),
-            self.token_type(TokenType.LEFT_PAREN),
-            self.label("table_elements", self.many(
-                    self.choice(
-                        self.column(),
-                        self.label("primary_key_constraint", self.primary_key(in_table_def=True)),
-                        self.label("foreign_key_constraint", self.foreign_key())
+            cls.label("table_name", cls.identifier()),
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("table_elements", cls.many(
+                    cls.choice(
+                        cls.column(),
+                        cls.label("primary_key_constraint", cls.primary_key(in_table_def=True)),
+                        cls.label("foreign_key_constraint", cls.foreign_key())
                     ),
-                    self.delimiter(",")
+                    cls.delimiter(",")
                 )),
-            self.token_type(TokenType.RIGHT_PAREN),
-            self.delimiter(";")
+            cls.token_type(TokenType.RIGHT_PAREN),
+            cls.delimiter(";")
         )
 
-    def insert(self): 
-        return self.sequence(
-            self.keyword("INSERT"),
-            self.keyword("INTO"),
-            self.label("table_name", self.identifier()),
-            self.label("columns", self.parse_column_list()),
-            self.keyword("VALUES"),
-            self.label("values", self.parse_value_lists())
+    @classmethod
+    def insert(cls) -> Rule: 
+        return cls.sequence(
+            cls.keyword("INSERT"),
+            cls.keyword("INTO"),
+            cls.label("table_name", cls.identifier()),
+            cls.label("columns", cls.parse_column_list()),
+            cls.keyword("VALUES")
         )
     
-    def foreign_key(self):
-        return self.choice(
-            self.sequence(
-                self.keyword("CONSTRAINT"),
-                self.label("constraint_name", self.identifier()),
-                self.keyword("FOREIGN"),
-                self.keyword("KEY"),
-                self.token_type(TokenType.LEFT_PAREN),
-                self.label("column_name", self.identifier()),
-                self.token_type(TokenType.RIGHT_PAREN),
-                self.keyword("REFERENCES"),
-                self.label("referenced_table", self.identifier()),
-                self.token_type(TokenType.LEFT_PAREN),
-                self.label("referenced_column", self.identifier()),
-                self.token_type(TokenType.RIGHT_PAREN)
+    @classmethod
+    def foreign_key(cls) -> Rule:
+        references = cls.memo(cls.sequence(
+            cls.keyword("FOREIGN"),
+            cls.keyword("KEY"),
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("column_name", cls.identifier()),
+            cls.token_type(TokenType.RIGHT_PAREN),
+            cls.keyword("REFERENCES"),
+            cls.label("referenced_table", cls.identifier()),
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("referenced_column", cls.identifier()),
+            cls.token_type(TokenType.RIGHT_PAREN)
+        ))
+        return cls.memo(cls.choice(
+            cls.sequence(
+                cls.keyword("CONSTRAINT"),
+                cls.label("constraint_name", cls.identifier()),
+                references
             ),
-            self.sequence(
-                self.keyword("FOREIGN"),
-                self.keyword("KEY"),
-                self.token_type(TokenType.LEFT_PAREN),
-                self.label("column_name", self.identifier()),
-                self.token_type(TokenType.RIGHT_PAREN),
-                self.keyword("REFERENCES"),
-                self.label("referenced_table", self.identifier()),
-                self.token_type(TokenType.LEFT_PAREN),
-                self.label("referenced_column", self.identifier()),
-                self.token_type(TokenType.RIGHT_PAREN)
-            )
-        )
+            references
+        ))
     
-    def column(self):
-        return self.sequence(
-            self.label("column_name", self.identifier()),
-            self.label("datatype", self.datatype()),
-            self.optional(
-                self.sequence(
-                    self.token_type(TokenType.LEFT_PAREN),
-                    self.label("size_params", self.many(self.literal(), self.delimiter(","))),
-                    self.token_type(TokenType.RIGHT_PAREN)
+    @classmethod
+    def column(cls) -> Rule:
+        return cls.memo(cls.sequence(
+            cls.label("column_name", cls.identifier()),
+            cls.label("datatype", cls.datatype()),
+            cls.optional(
+                cls.sequence(
+                    cls.token_type(TokenType.LEFT_PAREN),
+                    cls.label("size_params", cls.many(cls.literal(), cls.delimiter(","))),
+                    cls.token_type(TokenType.RIGHT_PAREN)
                 )
             ),
-            self.optional(self.label("constraints", self.many(self.constraint())))
-        )
+            cls.optional(cls.label("constraints", cls.many(cls.constraint())))
+        ))
     
-    def constraint(self):
-        return self.choice(
-            self.not_null(),
-            self.primary_key(),
-            self.auto_increment(),
-            self.unique(),
-            self.default()
-        )
+    @classmethod
+    def constraint(cls) -> Rule:
+        return cls.memo(cls.choice(
+            cls.not_null(),
+            cls.primary_key(),
+            cls.auto_increment(),
+            cls.unique(),
+            cls.default()
+        ))
     
-    def unique(self):
-        return self.keyword("UNIQUE")
-
-    def not_null(self):
-        def parser():
-            result = self.sequence(
-                self.keyword("NOT"),
-                self.keyword("NULL")
-            )()
-            if result.value is None:
-                return ParseResult()
-            return ParseResult(value="NOT NULL")
+    @classmethod
+    def unique(cls) -> Rule:
+        return cls.keyword("UNIQUE")
+
+    @classmethod
+    def not_null(cls) -> Rule:
+        not_null_parser = cls.sequence(
+            cls.keyword("NOT"),
+            cls.keyword("NULL")
+        )
+        def parser(p):
+            if not_null_parser(p) is FAIL:
+                return FAIL
+            return "NOT NULL"
         return parser
 
-    def primary_key(self, in_table_def=False):
+    @classmethod
+    def primary_key(cls, in_table_def=False) -> Rule:
         if not in_table_def:
-            def parser():
-                result = self.sequence(
-                    self.keyword("PRIMARY"),
-                    self.keyword("KEY")
-                )()
-                if result.value is None:
-                    return ParseResult()
-                return ParseResult(value="PRIMARY KEY")
+            primary_key_parser = cls.sequence(
+                cls.keyword("PRIMARY"),
+                cls.keyword("KEY")
+            )
+            def parser(p):
+                if primary_key_parser(p) is FAIL:
+                    return FAIL
+                return "PRIMARY KEY"
             return parser
         
-        return self.sequence(
-            self.keyword("PRIMARY"),
-            self.keyword("KEY"),
-            self.token_type(TokenType.LEFT_PAREN),
-            self.label("column_name", self.identifier()),
-            self.token_type(TokenType.RIGHT_PAREN)
-        )
+        return cls.memo(cls.sequence(
+            cls.keyword("PRIMARY"),
+            cls.keyword("KEY"),
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("column_name", cls.identifier()),
+            cls.token_type(TokenType.RIGHT_PAREN)
+        ))
 
-    def auto_increment(self):
-        return self.keyword("AUTO_INCREMENT")
+    @classmethod
+    def auto_increment(cls) -> Rule:
+        return cls.keyword("AUTO_INCREMENT")
     
-    def default(self):
-        def parser():
-            result = self.sequence(
-                self.keyword("DEFAULT"),
-                self.choice(
-                    self.literal(),
-                    self.keyword("NULL")
-                )
-            )()
-            if result.value is None:
-                return ParseResult()
-            if len(result.value) == 2:
-                return ParseResult(value=f"DEFAULT {result.value[1]}")
-            return ParseResult()
+    @classmethod
+    def default(cls) -> Rule:
+        default_parser = cls.sequence(
+            cls.keyword("DEFAULT"),
+            cls.choice(
+                cls.literal(),
+                cls.keyword("NULL")
+            )
+        )
+        def parser(p):
+            result = default_parser(p)
+            if result is FAIL:
+                return FAIL
+            if len(result) == 2:
+                return f"DEFAULT {result[1]}"
+            return FAIL
         return parser
     
-    def wrapped_identifier(self):
-        return self.sequence(
-            self.token_type(TokenType.LEFT_PAREN),
-            self.label("identifier", self.identifier()),
-            self.token_type(TokenType.RIGHT_PAREN)
+    @classmethod
+    def wrapped_identifier(cls) -> Rule:
+        return cls.sequence(
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("identifier", cls.identifier()),
+            cls.token_type(TokenType.RIGHT_PAREN)
         )
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from coercion import EPOCH, coerce_column
+
+DATATYPES = {
+    'int': 'INT',
+    'decimal': 'DECIMAL(10,2)',
+    'bool': 'BOOLEAN',
+    'timestamp': 'TIMESTAMP',
+    'string': 'TEXT',
+}
+
+
+def per_cell(kind: str, cells: list[str]) -> list:
+    # What consumers did before: re-parse every cell on its own
+    if kind == 'int':
+        return [int(cell) for cell in cells]
+    if kind == 'decimal':
+        return [Decimal(cell) for cell in cells]
+    if kind == 'bool':
+        return [cell.upper() == 'TRUE' for cell in cells]
+    if kind == 'timestamp':
+        return [(datetime.fromisoformat(cell[1:-1]).replace(tzinfo=timezone.utc) - EPOCH) // datetime.resolution
+                for cell in cells]
+    return [cell[1:-1] if cell[:1] == "'" else cell for cell in cells]
+
+
+def build_cells(kind: str, rows: int) -> list[str]:
+    if kind == 'int':
+        return [str(i) for i in range(rows)]
+    if kind == 'decimal':
+        return [f'{i % 10000}.{i % 100:02d}' for i in range(rows)]
+    if kind == 'bool':
+        return ['true' if i % 2 else 'FALSE' for i in range(rows)]
+    if kind == 'timestamp':
+        return [f"'2024-01-{i % 28 + 1:02d} 12:{i % 60:02d}:00'" for i in range(rows)]
+    return [f"'value {i}'" for i in range(rows)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare batched literal coercion with per-cell parsing.')
+    arg_parser.add_argument('--rows', type=int, default=1_000_000)
+    args = arg_parser.parse_args()
+
+    print(f"{'kind':>10} {'per-cell s':>11} {'batched s':>10}")
+    for kind, datatype in DATATYPES.items():
+        cells = build_cells(kind, args.rows)
+        start = time.perf_counter()
+        per_cell(kind, cells)
+        middle = time.perf_counter()
+        coerce_column(datatype, cells)
+        end = time.perf_counter()
+        print(f"{kind:>10} {middle - start:>11.3f} {end - middle:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from abstract_syntax_tree import AlterOperation, AlterTable, ColumnDef, CreateTable, Schema, Table
+
+
+def build_history(width: int, alter_count: int) -> Schema:
+    columns = [ColumnDef(name=f'col_{i}', datatype='INT') for i in range(width)]
+    schema = Schema(body=[CreateTable(table=Table(name='events'), columns=columns)])
+    for i in range(alter_count):
+        # each ALTER adds a column and drops the oldest surviving one
+        schema.body.append(AlterTable(table=Table(name='events'), operations=[
+            AlterOperation(action='ADD', column=ColumnDef(name=f'col_{width + i}', datatype='VARCHAR(64)')),
+            AlterOperation(action='DROP', column=ColumnDef(name=f'col_{i}', datatype='')),
+        ]))
+    return schema
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Time Schema.fold over long ALTER histories.')
+    arg_parser.add_argument('--width', type=int, default=500, help='columns in the folded table')
+    arg_parser.add_argument('--alters', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = arg_parser.parse_args()
+
+    print(f"{'alters':>8} {'seconds':>8} {'alters/s':>10}")
+    for alter_count in args.alters:
+        schema = build_history(args.width, alter_count)
+        start = time.perf_counter()
+        folded = schema.fold()
+        elapsed = time.perf_counter() - start
+        assert len(folded.body[0].columns) == args.width
+        print(f"{alter_count:>8} {elapsed:>8.3f} {alter_count / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
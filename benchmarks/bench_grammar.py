@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+
+
+class RebuildingParser(Parser):
+    # Mirrors the old behaviour of building every combinator per statement
+    @classmethod
+    def grammar(cls):
+        return cls.build_grammar()
+
+
+def build_source(statement_count: int) -> str:
+    with open(os.path.join(project_root, 'test_scripts', 'shop_tables.sql')) as f:
+        unit = f.read() + '\n'
+    # shop_tables.sql holds 11 statements
+    return unit * max(1, statement_count // 11)
+
+
+def measure(parser_cls, source: str) -> tuple[float, int, int]:
+    parser_cls.grammar()
+    start = time.perf_counter()
+    schema = parser_cls().produce_ast(source)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parser_cls().produce_ast(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(schema.body)
+
+
+def grammar_size() -> tuple[int, int]:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    grammar = Parser.build_grammar()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    del grammar
+    return sum(s.size_diff for s in stats), sum(s.count_diff for s in stats)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare parsing with a cached grammar against rebuilding it per statement.')
+    arg_parser.add_argument('--statements', type=int, default=5_500)
+    args = arg_parser.parse_args()
+
+    size, blocks = grammar_size()
+    print(f"one grammar build: {size} bytes in {blocks} blocks")
+
+    source = build_source(args.statements)
+    print(f"{'parser':>18} {'statements':>10} {'seconds':>8} {'us/stmt':>8} {'peak KB':>8}")
+    for parser_cls in (RebuildingParser, Parser):
+        elapsed, peak, count = measure(parser_cls, source)
+        print(f"{parser_cls.__name__:>18} {count:>10} {elapsed:>8.3f} {elapsed * 1_000_000 / count:>8.1f} {peak / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from abstract_syntax_tree import Insert, ValueLiteral
+from base_parser import FAIL
+from lexer import TokenType, tokenize
+from parser import Parser
+
+
+class CombinatorInsertParser(Parser):
+    # Reference implementation: VALUES parsed through many(literal) and one
+    # ValueLiteral model per cell, as before the bulk fast path
+    @classmethod
+    def build_grammar(cls):
+        grammar = super().build_grammar()
+        grammar['insert_values'] = cls.value_lists()
+        return grammar
+
+    @classmethod
+    def value_lists(cls):
+        value_list = cls.sequence(
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.label("cells", cls.many(cls.literal(), cls.delimiter(","))),
+            cls.token_type(TokenType.RIGHT_PAREN)
+        )
+        return cls.sequence(
+            cls.label("value_lists", cls.many(value_list, cls.delimiter(","))),
+            cls.delimiter(";")
+        )
+
+    def parse_insert_statement(self):
+        header = self.rule('insert')
+        values = self.rule('insert_values')
+        if header is FAIL or values is FAIL:
+            return None
+        rows = []
+        for value_list in values["value_lists"]:
+            if len(value_list["cells"]) != len(header["columns"]):
+                raise Exception("Columns and values have mismatched lengths")
+            rows.append([ValueLiteral(value=cell) for cell in value_list["cells"]])
+        return Insert(table_name=header["table_name"], columns=header["columns"], values=rows)
+
+
+def build_insert(rows: int) -> str:
+    tuples = ",\n".join(
+        f"  ({i}, 'Product {i}', {i % 1000}.99, 'Category {i % 17}', true)"
+        for i in range(rows)
+    )
+    return f"INSERT INTO products (id, name, price, category, is_available) VALUES\n{tuples};\n"
+
+
+def time_parse(parser_cls, source: str, statements: int) -> float:
+    tokens = tokenize(source)
+    parser = parser_cls()
+    start = time.perf_counter()
+    body = list(parser.parse_nodes(tokens))
+    elapsed = time.perf_counter() - start
+    assert len(body) == statements
+    return elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare the bulk INSERT fast path with the combinator path.')
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000])
+    arg_parser.add_argument('--statements', type=int, default=10)
+    args = arg_parser.parse_args()
+
+    print(f"{'rows':>8} {'combinator s':>12} {'fast s':>8} {'rows/s':>10} {'speedup':>8}")
+    for rows in args.rows:
+        source = build_insert(rows) * args.statements
+        slow = time_parse(CombinatorInsertParser, source, args.statements)
+        fast = time_parse(Parser, source, args.statements)
+        total_rows = rows * args.statements
+        print(f"{rows:>8} {slow:>12.3f} {fast:>8.3f} {total_rows / fast:>10.0f} {slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
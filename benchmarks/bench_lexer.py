@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lexer import tokenize, tokenize_file
+
+
+SIZES = [
+    1_000,
+    10_000,
+    100_000,
+    1_000_000,
+    10_000_000,
+    100_000_000,
+]
+
+
+def build_source(target_size: int) -> str:
+    with open(os.path.join(project_root, 'test_scripts', 'shop_tables.sql')) as f:
+        unit = f.read() + '\n'
+    repeats = max(1, target_size // len(unit))
+    return unit * repeats
+
+
+def bench_tokenize(source: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    tokens = tokenize(source)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(tokens)
+
+
+def bench_tokenize_file(source: str) -> float:
+    with tempfile.NamedTemporaryFile('w', suffix='.sql', delete=False) as f:
+        f.write(source)
+    try:
+        start = time.perf_counter()
+        tokenize_file(f.name)
+        return time.perf_counter() - start
+    finally:
+        os.unlink(f.name)
+
+
+def bench_memory(source: str) -> tuple[int, int]:
+    tracemalloc.start()
+    tokens = tokenize(source)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, len(tokens)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Measure how tokenize scales with input size.')
+    arg_parser.add_argument('--max-size', type=int, default=SIZES[-1], help='largest input size in bytes')
+    arg_parser.add_argument('--memory-size', type=int, default=1_000_000, help='input size used to measure bytes held per token')
+    args = arg_parser.parse_args()
+
+    held, token_count = bench_memory(build_source(args.memory_size))
+    print(f"{token_count} tokens hold {held / 1_000_000:.1f} MB, {held / token_count:.0f} bytes per token\n")
+
+    print(f"{'bytes':>12} {'tokens':>12} {'seconds':>10} {'MB/s':>8} {'us/KB':>8} {'mmap MB/s':>10}")
+    for size in SIZES:
+        if size > args.max_size:
+            break
+        source = build_source(size)
+        elapsed, token_count = bench_tokenize(source)
+        file_elapsed = bench_tokenize_file(source)
+        mb_per_s = len(source) / elapsed / 1_000_000
+        us_per_kb = elapsed * 1_000_000 / (len(source) / 1_000)
+        file_mb_per_s = len(source) / file_elapsed / 1_000_000
+        print(f"{len(source):>12} {token_count:>12} {elapsed:>10.4f} {mb_per_s:>8.2f} {us_per_kb:>8.1f} {file_mb_per_s:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from abstract_syntax_tree import ColumnDef, NodeType, ValueLiteral
+
+
+# The pydantic models these nodes were before the dataclass backend
+class PydanticValueLiteral(BaseModel):
+    type: Literal[NodeType.LITERAL] = NodeType.LITERAL
+    value: str
+
+
+class PydanticColumnDef(BaseModel):
+    type: Literal[NodeType.COLUMN_DEF] = NodeType.COLUMN_DEF
+    name: str = ""
+    datatype: str = ""
+    constraints: List[str] = Field(default_factory=list)
+
+
+CASES = [
+    ('ValueLiteral', PydanticValueLiteral, ValueLiteral, lambda i: {'value': str(i)}),
+    ('ColumnDef', PydanticColumnDef, ColumnDef, lambda i: {'name': f'col_{i}', 'datatype': 'INT', 'constraints': ['NOT NULL']}),
+]
+
+
+def construct_time(node_cls, make_kwargs, number: int) -> float:
+    kwargs = make_kwargs(1)
+    return min(timeit.repeat(lambda: node_cls(**kwargs), number=number, repeat=5)) / number
+
+
+def bytes_per_node(node_cls, make_kwargs, count: int) -> float:
+    kwargs = [make_kwargs(i) for i in range(count)]
+    tracemalloc.start()
+    nodes = [node_cls(**k) for k in kwargs]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del nodes
+    return held / count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare dataclass AST nodes with the old pydantic models.')
+    arg_parser.add_argument('--number', type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    print(f"{'node':>12} {'pydantic ns':>12} {'dataclass ns':>12} {'speedup':>8} {'pydantic B':>11} {'dataclass B':>11}")
+    for name, legacy_cls, node_cls, make_kwargs in CASES:
+        legacy_time = construct_time(legacy_cls, make_kwargs, args.number)
+        node_time = construct_time(node_cls, make_kwargs, args.number)
+        legacy_bytes = bytes_per_node(legacy_cls, make_kwargs, args.number)
+        node_bytes = bytes_per_node(node_cls, make_kwargs, args.number)
+        print(f"{name:>12} {legacy_time * 1e9:>12.0f} {node_time * 1e9:>12.0f} {legacy_time / node_time:>7.1f}x {legacy_bytes:>11.0f} {node_bytes:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+
+
+def build_source(target_size: int) -> str:
+    with open(os.path.join(project_root, 'test_scripts', 'shop_tables.sql')) as f:
+        unit = f.read() + '\n'
+    return unit * max(1, target_size // len(unit))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare serial parsing with produce_ast_parallel.')
+    arg_parser.add_argument('--size', type=int, default=10_000_000, help='input size in bytes')
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = arg_parser.parse_args()
+
+    source = build_source(args.size)
+    start = time.perf_counter()
+    statements = len(Parser().produce_ast(source).body)
+    serial = time.perf_counter() - start
+    print(f"{len(source)} bytes, {statements} statements, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'seconds':>8} {'MB/s':>8} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:>8.2f} {len(source) / serial / 1_000_000:>8.2f} {1:>7.2f}x")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        Parser().produce_ast_parallel(source, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {elapsed:>8.2f} {len(source) / elapsed / 1_000_000:>8.2f} {serial / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
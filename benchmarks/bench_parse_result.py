@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import timeit
+from typing import Any
+
+from pydantic import BaseModel
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from base_parser import BaseParser
+from lexer import TokenType, tokenize
+from token_stream import TokenStream
+
+
+class LegacyParseResult(BaseModel):
+    value: Any = None
+    is_optional: bool = False
+
+
+def legacy_keyword(expected_word):
+    # The terminal shape every rule had while results were pydantic models
+    def parser(p):
+        token = p.stream.curr()
+        if token.type == TokenType.KEYWORD and token.value == expected_word:
+            p.stream.advance()
+            return LegacyParseResult(value=token.value)
+        return LegacyParseResult()
+    return parser
+
+
+def time_rule(rule, source: str, number: int) -> float:
+    parser = BaseParser()
+    parser.stream = TokenStream(tokenize(source))
+
+    def run():
+        parser.stream.rewind(0)
+        rule(parser)
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare pydantic parse results with the FAIL/value protocol.')
+    arg_parser.add_argument('--number', type=int, default=200_000)
+    args = arg_parser.parse_args()
+
+    cases = [
+        ('match', 'CREATE'),
+        ('miss', 'ALTER'),
+    ]
+    print(f"{'case':>6} {'legacy ns':>10} {'current ns':>10} {'speedup':>8}")
+    for name, source in cases:
+        legacy = time_rule(legacy_keyword('CREATE'), source, args.number)
+        current = time_rule(BaseParser.keyword('CREATE'), source, args.number)
+        print(f"{name:>6} {legacy * 1e9:>10.0f} {current * 1e9:>10.0f} {legacy / current:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
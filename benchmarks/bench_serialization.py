@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from abstract_syntax_tree import ColumnDef, CreateTable, Insert, Schema, Table, ValueRows
+
+
+def build_schema(tables: int, rows: int) -> Schema:
+    schema = Schema()
+    for t in range(tables):
+        columns = [ColumnDef(name=f'col_{i}', datatype='VARCHAR(64)', constraints=['NOT NULL']) for i in range(20)]
+        schema.body.append(CreateTable(table=Table(name=f'table_{t}'), columns=columns))
+        cells = [f"'value {r % 1000} {c}'" for r in range(rows) for c in range(4)]
+        schema.body.append(Insert(table_name=f'table_{t}', columns=['col_0', 'col_1', 'col_2', 'col_3'],
+                                  values=ValueRows(cells, 4)))
+    return schema
+
+
+def best_of(repeat: int, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare Schema.to_bytes against the JSON dump.')
+    arg_parser.add_argument('--tables', type=int, default=50)
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[100, 10_000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{'rows':>8} {'format':>6} {'bytes':>12} {'dump s':>8} {'load s':>8}")
+    for rows in args.rows:
+        schema = build_schema(args.tables, rows)
+        json_data = schema.to_json()
+        binary_data = schema.to_bytes()
+        assert Schema.from_bytes(binary_data) == schema
+
+        for name, data, dump, load in (
+            ('json', json_data, schema.to_json, lambda: Schema.from_json(json_data)),
+            ('binary', binary_data, schema.to_bytes, lambda: Schema.from_bytes(binary_data)),
+        ):
+            dump_time = best_of(args.repeat, dump)
+            load_time = best_of(args.repeat, load)
+            print(f"{rows:>8} {name:>6} {len(data):>12} {dump_time:>8.3f} {load_time:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lexer import tokenize
+from parser import Parser
+from workloads import WORKLOADS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+STAGES = ['tokenize', 'produce_ast', 'fold', 'sql']
+
+
+def best_of(repeat: int, fn) -> tuple[float, object]:
+    # Best wall time of several runs, with the collector kept out of the timed region
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best, result
+
+
+def run_workload(name: str, scale: float, repeat: int) -> dict:
+    source, statements = WORKLOADS[name](scale)
+    megabytes = len(source.encode('utf-8')) / 1e6
+
+    timings = {}
+    timings['tokenize'], _ = best_of(repeat, lambda: tokenize(source))
+    timings['produce_ast'], schema = best_of(repeat, lambda: Parser().produce_ast(source))
+    timings['fold'], _ = best_of(repeat, schema.fold)
+    timings['sql'], _ = best_of(repeat, schema.sql)
+
+    return {
+        'megabytes': megabytes,
+        'statements': statements,
+        'stages': {
+            stage: {
+                'seconds': seconds,
+                'mb_per_s': megabytes / seconds if seconds else None,
+                'statements_per_s': statements / seconds if seconds else None,
+            }
+            for stage, seconds in timings.items()
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('workloads', {}).get(name)
+        if base is None:
+            continue
+        for stage in STAGES:
+            now = result['stages'][stage]['seconds']
+            then = base['stages'][stage]['seconds']
+            if then and now > then * (1 + tolerance):
+                regressions.append(f"{name}/{stage}: {then:.4f}s -> {now:.4f}s ({now / then:.2f}x)")
+    return regressions
+
+
+def print_results(results: dict, baseline: dict | None):
+    print(f"{'workload':>14} {'stage':>12} {'seconds':>9} {'MB/s':>9} {'stmts/s':>11} {'vs base':>8}")
+    for name, result in results.items():
+        base = (baseline or {}).get('workloads', {}).get(name)
+        for stage in STAGES:
+            row = result['stages'][stage]
+            ratio = ''
+            if base is not None and row['seconds']:
+                ratio = f"{base['stages'][stage]['seconds'] / row['seconds']:.2f}x"
+            print(f"{name:>14} {stage:>12} {row['seconds']:>9.4f} {row['mb_per_s'] or 0:>9.2f} "
+                  f"{row['statements_per_s'] or 0:>11.0f} {ratio:>8}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Time tokenize, produce_ast, fold and sql on synthetic workloads and compare with a baseline.')
+    arg_parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS))
+    arg_parser.add_argument('--scale', type=float, default=1.0, help='multiplies every workload size')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per stage; the best time is kept')
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    arg_parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='slowdown over the baseline reported as a regression')
+    arg_parser.add_argument('--check', action='store_true', help='exit non-zero when a stage regressed')
+    args = arg_parser.parse_args()
+
+    results = {name: run_workload(name, args.scale, args.repeat) for name in args.workloads}
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f"baseline was recorded at scale {baseline.get('scale')}, not comparing")
+            baseline = None
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'scale': args.scale,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'workloads': results,
+            }, f, indent=1)
+        print(f"saved baseline to {args.baseline}")
+        return
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions and args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATATYPES = ['INT', 'VARCHAR(64)', 'DECIMAL(10,2)', 'TIMESTAMP', 'BOOLEAN', 'TEXT']
+
+# Each generator returns (sql, statement count) and grows linearly with scale
+
+
+def word(number: int) -> str:
+    # Identifiers can't contain digits, so numbers are spelled with letters
+    return ''.join(chr(ord('a') + int(digit)) for digit in str(number))
+
+
+def shop_tables(scale: float) -> tuple[str, int]:
+    with open(os.path.join(project_root, 'test_scripts', 'shop_tables.sql')) as f:
+        unit = f.read() + '\n'
+    repeats = max(1, int(200 * scale))
+    return unit * repeats, unit.count(';') * repeats
+
+
+def wide_creates(scale: float) -> tuple[str, int]:
+    tables = max(1, int(100 * scale))
+    statements = []
+    for t in range(tables):
+        columns = ['  id INT PRIMARY KEY NOT NULL']
+        for c in range(200):
+            constraint = ' NOT NULL' if c % 3 == 0 else ''
+            columns.append(f'  col_{word(c)} {DATATYPES[c % len(DATATYPES)]}{constraint}')
+        columns.append(f'  FOREIGN KEY (col_a) REFERENCES table_{word(max(t - 1, 0))}(id)')
+        statements.append(f'CREATE TABLE table_{word(t)} (\n' + ',\n'.join(columns) + '\n);\n')
+    return ''.join(statements), tables
+
+
+def alter_history(scale: float) -> tuple[str, int]:
+    alters = max(1, int(5_000 * scale))
+    columns = ',\n'.join(f'  col_{word(c)} INT' for c in range(50))
+    statements = [f'CREATE TABLE events (\n{columns}\n);\n']
+    for i in range(alters):
+        # each ALTER adds a column and drops the oldest surviving one
+        statements.append(
+            f'ALTER TABLE events\nADD COLUMN col_{word(50 + i)} VARCHAR(64) NOT NULL,\nDROP COLUMN col_{word(i)};\n'
+        )
+    return ''.join(statements), alters + 1
+
+
+def bulk_insert(scale: float) -> tuple[str, int]:
+    rows = max(1, int(100_000 * scale))
+    create = (
+        'CREATE TABLE products (\n  id INT PRIMARY KEY NOT NULL,\n  name VARCHAR(100) NOT NULL,\n'
+        '  price DECIMAL(10,2),\n  category VARCHAR(50)\n);\n'
+    )
+    values = ',\n'.join(f"  ({i}, 'Product {i}', {i % 1000}.99, 'Category {i % 20}')" for i in range(rows))
+    return f'{create}INSERT INTO products (id, name, price, category) VALUES\n{values};\n', 2
+
+
+def many_updates(scale: float) -> tuple[str, int]:
+    updates = max(1, int(20_000 * scale))
+    statements = ['CREATE TABLE orders (\n  order_id INT PRIMARY KEY NOT NULL,\n  status VARCHAR(20)\n);\n']
+    for i in range(updates):
+        statements.append(f"UPDATE orders SET status = 'shipped' WHERE order_id = {i};\n")
+    return ''.join(statements), updates + 1
+
+
+WORKLOADS = {
+    'shop_tables': shop_tables,
+    'wide_creates': wide_creates,
+    'alter_history': alter_history,
+    'bulk_insert': bulk_insert,
+    'many_updates': many_updates,
+}
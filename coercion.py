@@ -0,0 +1,127 @@
+import re
+from array import array
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from abstract_syntax_tree import ColumnDef, ValueRows
+
+# Base SQL datatype -> (column kind, array typecode). DECIMAL(p,s) is coerced
+# exactly, to int64 counts of 10**-s, and TIMESTAMP to microseconds since the
+# epoch, read as UTC.
+COLUMN_KINDS = {
+    'INT': ('int', 'q'),
+    'TINYINT': ('int', 'q'),
+    'DECIMAL': ('decimal', 'q'),
+    'BOOLEAN': ('bool', 'B'),
+    'TIMESTAMP': ('timestamp', 'q'),
+    'VARCHAR': ('string', None),
+    'TEXT': ('string', None),
+}
+BOOLEAN_VALUES = {'TRUE': 1, 'true': 1, 'True': 1, '1': 1, 'FALSE': 0, 'false': 0, 'False': 0, '0': 0}
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# A bare DECIMAL is DECIMAL(10,0), as in MySQL
+DEFAULT_DECIMAL = (10, 0)
+DECIMAL_ARGS = re.compile(r"\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)")
+
+# Only backslash escapes are undone. The lexer ends a literal at the first
+# matching quote, so a cell never holds its own quote character doubled, and
+# a doubled quote of the other kind is literal text.
+ESCAPE = re.compile(r"\\(.)")
+ESCAPED_CHARS = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+
+def column_kind(datatype: str) -> tuple[str, str | None]:
+    # 'VARCHAR(64)' and 'DECIMAL(10,2)' look up by their base name; anything
+    # unknown is treated as text
+    return COLUMN_KINDS.get(datatype.split('(', 1)[0].strip().upper(), ('string', None))
+
+def decimal_spec(datatype: str) -> tuple[int, int]:
+    # (precision, scale) of a DECIMAL datatype
+    match = DECIMAL_ARGS.search(datatype)
+    if match is None:
+        return DEFAULT_DECIMAL
+    return int(match.group(1)), int(match.group(2) or 0)
+
+def unescape(match: re.Match) -> str:
+    char = match.group(1)
+    return ESCAPED_CHARS.get(char, char)
+
+def coerce_strings(cells: list[str]) -> list[str]:
+    stripped = [cell[1:-1] if cell[:1] in ('"', "'") else cell for cell in cells]
+    # one scan of the whole column tells whether any cell needs unescaping.
+    # Cells are unescaped one by one: quoted literals may hold any character,
+    # NUL included, so there is no separator to join and re-split them on.
+    if '\\' not in ''.join(stripped):
+        return stripped
+    return [ESCAPE.sub(unescape, cell) if '\\' in cell else cell for cell in stripped]
+
+# Numbers and timestamps are parsed by the stdlib only, so results never
+# depend on whether numpy happens to be installed (numpy reads 'NaT' and
+# rejects compact ISO forms fromisoformat takes, and is no faster on str)
+def coerce_ints(cells: list[str]) -> array:
+    return array('q', map(int, cells))
+
+def coerce_decimals(cells: list[str], scale: int) -> array:
+    # When every cell is plain digits with at most scale places, dropping the
+    # point and padding the places gives the scaled value directly
+    parts = [cell.partition('.') for cell in cells]
+    if max([len(fraction) for _, _, fraction in parts], default=0) <= scale:
+        try:
+            return array('q', [int(whole + fraction.ljust(scale, '0')) for whole, _, fraction in parts])
+        except ValueError:
+            pass
+    # exponents and extra places go through Decimal and round half up
+    return array('q', [scale_decimal(cell, scale) for cell in cells])
+
+def scale_decimal(cell: str, scale: int) -> int:
+    try:
+        return int(Decimal(cell).scaleb(scale).to_integral_value(ROUND_HALF_UP))
+    except InvalidOperation:
+        raise ValueError(f"Invalid DECIMAL literal: {cell}") from None
+
+def coerce_bools(cells: list[str]) -> array:
+    try:
+        return array('B', map(BOOLEAN_VALUES.__getitem__, cells))
+    except KeyError:
+        pass
+    # mixed-case spellings are rare, so the column is only upper-cased for them
+    try:
+        return array('B', map(BOOLEAN_VALUES.__getitem__, map(str.upper, cells)))
+    except KeyError as e:
+        raise ValueError(f"Invalid BOOLEAN literal: {e.args[0]}") from None
+
+def coerce_timestamps(cells: list[str]) -> array:
+    micros = array('q')
+    parsed: dict[str, int] = {}
+    for value in coerce_strings(cells):
+        # dumps repeat timestamps a lot, so each distinct one is parsed once
+        offset = parsed.get(value)
+        if offset is None:
+            moment = datetime.fromisoformat(value)
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            offset = parsed[value] = (moment - EPOCH) // datetime.resolution
+        micros.append(offset)
+    return micros
+
+COERCERS = {
+    'int': coerce_ints,
+    'bool': coerce_bools,
+    'timestamp': coerce_timestamps,
+    'string': coerce_strings,
+}
+
+
+def coerce_column(datatype: str, cells: list[str]) -> array | list[str]:
+    kind, _ = column_kind(datatype)
+    if kind == 'decimal':
+        return coerce_decimals(cells, decimal_spec(datatype)[1])
+    return COERCERS[kind](cells)
+
+def coerce_rows(columns: list[ColumnDef], rows: ValueRows) -> dict[str, array | list[str]]:
+    # columns are the INSERT's columns in order, with their table datatypes
+    if len(columns) != rows.width:
+        raise ValueError("Columns and values have mismatched lengths")
+    return {
+        column.name: coerce_column(column.datatype, rows.column(position))
+        for position, column in enumerate(columns)
+    }
@@ -0,0 +1,151 @@
+from array import array
+from decimal import Decimal
+from itertools import accumulate
+from typing import Iterator
+from abstract_syntax_tree import ColumnDef, NodeType, Schema, SchemaFolder
+from coercion import coerce_column, coerce_strings, column_kind, decimal_spec
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class Column:
+    # One typed column. Fixed width kinds keep their values in an array
+    # (decimals as int64 counts of 10**-scale); strings use the Arrow layout
+    # of int64 offsets into one utf-8 buffer.
+    __slots__ = ('name', 'datatype', 'kind', 'values', 'offsets', 'data', 'precision', 'scale')
+
+    def __init__(self, column: ColumnDef, cells: list[str]):
+        self.name = column.name
+        self.datatype = column.datatype
+        self.kind, typecode = column_kind(column.datatype)
+        self.values = None
+        self.offsets = None
+        self.data = None
+        self.precision = self.scale = None
+        if self.kind == 'decimal':
+            self.precision, self.scale = decimal_spec(column.datatype)
+        if typecode is not None:
+            self.values = coerce_column(column.datatype, cells)
+        else:
+            strings = [string.encode('utf-8') for string in coerce_strings(cells)]
+            self.offsets = array('q', [0])
+            self.offsets.extend(accumulate(map(len, strings)))
+            self.data = b''.join(strings)
+
+    def __len__(self) -> int:
+        if self.values is not None:
+            return len(self.values)
+        return len(self.offsets) - 1
+
+    def to_list(self) -> list:
+        if self.kind == 'bool':
+            return [bool(value) for value in self.values]
+        if self.kind == 'decimal':
+            return [Decimal(value).scaleb(-self.scale) for value in self.values]
+        if self.values is not None:
+            return self.values.tolist()
+        data = self.data
+        offsets = self.offsets
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def to_numpy(self):
+        if numpy is None:
+            raise ImportError("to_numpy requires numpy")
+        if self.kind == 'string' or self.kind == 'decimal':
+            return numpy.array(self.to_list(), dtype=object)
+        values = numpy.frombuffer(self.values, dtype=self.values.typecode)
+        if self.kind == 'bool':
+            return values.astype(numpy.bool_)
+        if self.kind == 'timestamp':
+            return values.view('datetime64[us]')
+        return values
+
+    def to_arrow(self):
+        if pyarrow is None:
+            raise ImportError("to_arrow requires pyarrow")
+        length = len(self)
+        if self.kind == 'string':
+            buffers = [None, pyarrow.py_buffer(self.offsets), pyarrow.py_buffer(self.data)]
+            return pyarrow.Array.from_buffers(pyarrow.large_string(), length, buffers)
+        if self.kind == 'bool':
+            return pyarrow.array(self.values, type=pyarrow.uint8()).cast(pyarrow.bool_())
+        if self.kind == 'decimal':
+            # decimal128 is the unscaled value as a little-endian 128-bit
+            # integer: the int64 as the low word, its sign as the high word
+            words = array('q', bytes(16 * length))
+            words[0::2] = self.values
+            words[1::2] = array('q', [-1 if value < 0 else 0 for value in self.values])
+            arrow_type = pyarrow.decimal128(self.precision, self.scale)
+            return pyarrow.Array.from_buffers(arrow_type, length, [None, pyarrow.py_buffer(words)])
+        arrow_type = {
+            'int': pyarrow.int64(),
+            'decimal': pyarrow.float64(),
+            'timestamp': pyarrow.timestamp('us', tz='UTC'),
+        }[self.kind]
+        return pyarrow.Array.from_buffers(arrow_type, length, [None, pyarrow.py_buffer(self.values)])
+
+
+class ColumnarTable:
+    __slots__ = ('name', 'columns')
+
+    def __init__(self, name: str, columns: list[Column]):
+        self.name = name
+        self.columns = {column.name: column for column in columns}
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def __iter__(self) -> Iterator[Column]:
+        return iter(self.columns.values())
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def to_numpy(self) -> dict:
+        return {name: column.to_numpy() for name, column in self.columns.items()}
+
+    def to_arrow(self):
+        if pyarrow is None:
+            raise ImportError("to_arrow requires pyarrow")
+        return pyarrow.Table.from_arrays([column.to_arrow() for column in self], names=list(self.columns))
+
+
+def export_table(schema: Schema, table_name: str) -> ColumnarTable:
+    # Column types come from the table as folded at the end of the schema.
+    # Every INSERT into the table has to supply the same set of columns; with
+    # no INSERTs the table has every folded column, empty.
+    folder = SchemaFolder(keep_statements=False)
+    inserts = []
+    for node in schema.body:
+        folder.apply(node)
+        if node.type == NodeType.INSERT and node.table_name == table_name:
+            inserts.append(node)
+
+    index = folder.column_indexes.get(table_name)
+    if index is None:
+        raise ValueError(f"No CREATE TABLE for {table_name}")
+    definitions = {column.name: column for column in index.columns()}
+
+    names = list(inserts[0].columns) if inserts else list(definitions)
+    cells: dict[str, list[str]] = {name: [] for name in names}
+    for insert in inserts:
+        if sorted(insert.columns) != sorted(names):
+            raise ValueError(f"INSERT into {table_name} supplies columns {insert.columns}, expected {names}")
+        for position, name in enumerate(insert.columns):
+            cells[name].extend(insert.values.column(position))
+
+    columns = []
+    for name in names:
+        definition = definitions.get(name)
+        if definition is None:
+            raise ValueError(f"Column {name} is not defined on {table_name}")
+        columns.append(Column(definition, cells[name]))
+    return ColumnarTable(table_name, columns)
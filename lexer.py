@@ -1,5 +1,10 @@
+import mmap
+import os
+import re
+import sys
+from contextlib import contextmanager
 from enum import Enum
-from pydantic.dataclasses import dataclass
+from typing import Iterable, Iterator
 
 
 
@@ -60,10 +65,19 @@ TokenType = Enum(
 )
 
 
-@dataclass
 class Token:
-    value: str
-    type:  TokenType
+    __slots__ = ('value', 'type', 'offset')
+
+    def __init__(self, value: str, type: TokenType, offset: int = -1):
+        self.value = value
+        self.type = type
+        # index of the token's first character in the source, -1 if synthetic
+        self.offset = offset
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return self.value == other.value and self.type == other.type
 
     def __str__(self) -> str:
         return f"\nvalue: \"{self.value}\" type: {self.type.name}"
@@ -80,68 +94,323 @@ def isint(src:str) -> bool:
 def isskippable(src:str) -> bool:
     return src == ' ' or src == '\n' or src == '\t'
 
-def create_token_from_string(string: str)->Token:
-    if (string in KEYWORDS):
-        return Token(value=string, type=TokenType.KEYWORD)
-    elif (string in DATATYPE):
-        return Token(value=string, type=TokenType.DATATYPE)
-    elif string.upper() in BOOLEAN_LITERALS:
-        return Token(value=string, type=TokenType.LITERAL)
-    else:
-        return Token(value=string, type=TokenType.IDENTIFIER)
+# Every keyword and datatype maps straight to its token type; booleans are
+# matched case-insensitively, so they are looked up upper-cased
+WORD_TYPES: dict[str, TokenType] = {
+    **{word: TokenType.KEYWORD for word in KEYWORDS},
+    **{word: TokenType.DATATYPE for word in DATATYPE},
+}
+BOOLEAN_WORDS = frozenset(BOOLEAN_LITERALS)
+
+def word_type(string: str) -> TokenType:
+    token_type = WORD_TYPES.get(string)
+    if (token_type is not None):
+        return token_type
+    if (len(string) <= 5 and string.upper() in BOOLEAN_WORDS):
+        return TokenType.LITERAL
+    return TokenType.IDENTIFIER
+
+def create_token_from_string(string: str, offset: int = -1)->Token:
+    # Words repeat constantly in dumps, so every token of the same word
+    # shares one string object
+    string = sys.intern(string)
+    return Token(value=string, type=word_type(string), offset=offset)
+
+# Character classes for the per-character scan of non-ASCII runs. ASCII is
+# filled in up front; any other character is classified with isalpha and
+# isdigit the first time it is seen and remembered.
+CHAR_WORD = 1
+CHAR_NUMBER = 2
+CHAR_OTHER = 3
+
+CHAR_CLASSES: dict[str, int] = {}
+
+def char_class(char: str) -> int:
+    char_cls = CHAR_CLASSES.get(char)
+    if (char_cls is None):
+        if (isalpha(char) or char == '_'):
+            char_cls = CHAR_WORD
+        elif (isint(char) or char == '.'):
+            char_cls = CHAR_NUMBER
+        else:
+            char_cls = CHAR_OTHER
+        CHAR_CLASSES[char] = char_cls
+    return char_cls
+
+for code in range(128):
+    char_class(chr(code))
+
+# One match of the master pattern per token, leading whitespace included.
+# Pure ASCII words and numbers match whole; their possessive runs refuse to
+# stop right before a non-ASCII character, so any run touching one lands in
+# the unicode group and is split by character class exactly like
+# str.isalpha/isdigit would. Groups are dispatched on by number.
+MASTER_TOKEN = re.compile(r"""[ \n\t]*(?:
+    (?P<punct>[(),;=])
+  | (?P<literal>'[^']*'|"[^"]*"|[0-9.]++(?![^\x00-\x7f]))
+  | (?P<word>[A-Za-z_]++)(?![^\x00-\x7f])
+  | (?P<unicode>[\w.]*[^\x00-\x7f][\w.]*)
+)""", re.VERBOSE)
+PUNCT_GROUP = 1
+LITERAL_GROUP = 2
+WORD_GROUP = 3
+
+PUNCTUATION_TYPES = {
+    '(': TokenType.LEFT_PAREN,
+    ')': TokenType.RIGHT_PAREN,
+    ',': TokenType.DELIMITER,
+    ';': TokenType.DELIMITER,
+    '=': TokenType.EQUALS,
+}
 
 def tokenize(sourceCode: str) -> list[Token]:
-    tokens:list[Token] = []
-    src = list(sourceCode)
-    
-    while (len(src) > 0):
-        token = None
-        if (isskippable(src[0])):
-            src.pop(0)
-            continue
-        elif (src[0] == '('):
-            token = Token(value=src.pop(0), type=TokenType.LEFT_PAREN)
-        elif (src[0] == ')'):
-            token = Token(value=src.pop(0), type=TokenType.RIGHT_PAREN)
-        elif (src[0] == ','):
-            token = Token(value=src.pop(0), type=TokenType.DELIMITER)
-        elif (src[0] == ';'):
-            token = Token(value=src.pop(0), type=TokenType.DELIMITER)
-        elif (src[0] == '='):
-            token = Token(value=src.pop(0), type=TokenType.EQUALS)
+    return list(iter_tokens(sourceCode))
+
+def iter_tokens(sourceCode: str) -> Iterator[Token]:
+    # Lazy form of tokenize: tokens are produced as the consumer asks for
+    # them, EOF last, and lexing errors surface when the bad spot is reached
+    words: dict[str, tuple[str, TokenType]] = {}
+    pos = 0
+
+    for match in MASTER_TOKEN.finditer(sourceCode):
+        if (match.start() != pos):
+            raise_unexpected_char(sourceCode, pos)
+        pos = match.end()
+        group = match.lastindex
+
+        if (group == PUNCT_GROUP):
+            char = match[group]
+            yield Token(char, PUNCTUATION_TYPES[char], pos - 1)
+        elif (group == LITERAL_GROUP):
+            text = match[group]
+            yield Token(text, TokenType.LITERAL, pos - len(text))
+        elif (group == WORD_GROUP):
+            text = match[group]
+            word = words.get(text)
+            if (word is None):
+                interned = sys.intern(text)
+                word = words[text] = (interned, word_type(interned))
+            yield Token(word[0], word[1], pos - len(text))
         else:
-            if (src[0] == "'" or src[0] == '"'):
-                quote_char = src.pop(0)
-                string_value = f"{quote_char}"
-                while (len(src) > 0 and src[0] != quote_char):
-                    string_value += src.pop(0)
-
-                if len(src) > 0 and src[0] == quote_char:
-                    string_value += src.pop(0)
-                    token = Token(value=string_value, type=TokenType.LITERAL)
-                else:
-                    raise Exception("Expected closing quote")
-            else: 
-                if (isint(src[0]) or src[0] == "."):
-                    num = ""
-                    while (len(src) > 0 and (isint(src[0]) or src[0] == ".")):
-                        num += src.pop(0)
-                    token = Token(value=num, type=TokenType.LITERAL)
-                    num = ""
-                elif (isalpha(src[0]) or src[0] == '_'):
-                    string = ""
-                    while (len(src) > 0 and (isalpha(src[0]) or src[0] == '_') and src[0] != " "):
-                        string += src.pop(0)
-                    token = create_token_from_string(string)
-                else:
-                    raise Exception(f'Unexpected non-digit, non-alpha char encountered: {src[0]}')
-
-        if (token is None):
-            token = Token(value=src.pop(0), type=TokenType.UKNOWN)
-        # print(f'Token: {token}')
-        tokens.append(token)
-    tokens.append(Token(value='End of File', type=TokenType.EOF))
-    return tokens
+            yield from tokenize_run(sourceCode, match.start(group), pos)
+
+    if (sourceCode[pos:].strip(' \n\t')):
+        raise_unexpected_char(sourceCode, pos)
+    yield Token(value='End of File', type=TokenType.EOF, offset=len(sourceCode))
+
+def tokenize_run(src: str, pos: int, end: int) -> Iterator[Token]:
+    # Splits src[pos:end], a run of word, digit and '.' characters holding
+    # non-ASCII text, into words and numbers by character class
+    while (pos < end):
+        run_cls = char_class(src[pos])
+        if (run_cls == CHAR_OTHER):
+            raise_unexpected_char(src, pos)
+        run_end = pos + 1
+        while (run_end < end and char_class(src[run_end]) == run_cls):
+            run_end += 1
+        if (run_cls == CHAR_WORD):
+            yield create_token_from_string(src[pos:run_end], pos)
+        else:
+            yield Token(value=src[pos:run_end], type=TokenType.LITERAL, offset=pos)
+        pos = run_end
+
+def raise_unexpected_char(src: str, pos: int):
+    # pos may sit on whitespace in front of the offending character
+    while (isskippable(src[pos])):
+        pos += 1
+    char = src[pos]
+    if (char == "'" or char == '"'):
+        raise Exception("Expected closing quote")
+    raise Exception(f'Unexpected non-digit, non-alpha char encountered: {char}')
+
 
+# Byte-level twin of tokenize for mapped files, built the same way and with
+# the same group numbers: one match per token with leading whitespace
+# folded in, and possessive ASCII runs that refuse to stop right before a
+# non-ASCII byte. Runs that mix in non-ASCII bytes are decoded and handed to
+# tokenize so letters and digits are classified exactly like the str path.
+# '\r' counts as whitespace because reading a file in text mode would have
+# translated it away.
+BYTE_TOKEN = re.compile(rb"""[ \t\n\r]*(?:
+    (?P<punct>[(),;=])
+  | (?P<literal>'[^']*'|"[^"]*"|[0-9.]++(?![\x80-\xff]))
+  | (?P<word>[A-Za-z_]++)(?![\x80-\xff])
+  | (?P<unicode>[A-Za-z0-9_.]*[\x80-\xff][\x80-\xffA-Za-z0-9_.]*)
+)""", re.VERBOSE)
 
+PUNCTUATION = {
+    b'(': ('(', TokenType.LEFT_PAREN),
+    b')': (')', TokenType.RIGHT_PAREN),
+    b',': (',', TokenType.DELIMITER),
+    b';': (';', TokenType.DELIMITER),
+    b'=': ('=', TokenType.EQUALS),
+}
 
+def tokenize_bytes(data) -> list[Token]:
+    return list(iter_tokens_bytes(data))
+
+def iter_tokens_bytes(data) -> Iterator[Token]:
+    # data is any bytes-like object the re module can scan, e.g. an mmap.
+    # Token offsets are byte offsets into data.
+    words: dict[bytes, tuple[str, TokenType]] = {}
+    pos = 0
+
+    for match in BYTE_TOKEN.finditer(data):
+        if (match.start() != pos):
+            raise_unexpected_byte(data, pos)
+        pos = match.end()
+        group = match.lastindex
+
+        if (group == PUNCT_GROUP):
+            value, token_type = PUNCTUATION[match[group]]
+            yield Token(value, token_type, pos - 1)
+        elif (group == LITERAL_GROUP):
+            raw = match[group]
+            value = raw.decode('utf-8')
+            if ('\r' in value):
+                value = value.replace('\r\n', '\n').replace('\r', '\n')
+            yield Token(value, TokenType.LITERAL, pos - len(raw))
+        elif (group == WORD_GROUP):
+            raw = match[group]
+            word = words.get(raw)
+            if (word is None):
+                interned = sys.intern(raw.decode('ascii'))
+                word = words[raw] = (interned, word_type(interned))
+            yield Token(word[0], word[1], pos - len(raw))
+        else:
+            start = match.start(group)
+            text = match[group].decode('utf-8')
+            for token in tokenize(text)[:-1]:
+                token.offset = start + len(text[:token.offset].encode('utf-8'))
+                yield token
+
+    if (data[pos:].strip(b' \t\n\r')):
+        raise_unexpected_byte(data, pos)
+    yield Token(value='End of File', type=TokenType.EOF, offset=len(data))
+
+def raise_unexpected_byte(data, pos: int):
+    # pos may sit on whitespace in front of the offending byte
+    while (data[pos:pos + 1] in (b' ', b'\t', b'\n', b'\r')):
+        pos += 1
+    if (data[pos:pos + 1] in (b"'", b'"')):
+        raise Exception("Expected closing quote")
+    char = bytes(data[pos:pos + 4]).decode('utf-8', errors='replace')[0]
+    raise Exception(f'Unexpected non-digit, non-alpha char encountered: {char}')
+
+def tokenize_file(path: str | os.PathLike) -> list[Token]:
+    return list(iter_tokens_file(path))
+
+def iter_tokens_file(path: str | os.PathLike) -> Iterator[Token]:
+    # The file stays mapped until the last token has been read
+    with map_file(path) as data:
+        yield from iter_tokens_bytes(data)
+
+@contextmanager
+def map_file(path: str | os.PathLike) -> Iterator[mmap.mmap | bytes]:
+    # Empty files can't be mapped, so they read as b''
+    with open(path, 'rb') as f:
+        if (os.fstat(f.fileno()).st_size == 0):
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+STATEMENT_BOUNDARY = re.compile(r"""['";]""")
+# A whole statement through its ';', quoted strings included, in one match
+WHOLE_STATEMENT = re.compile(r"""(?:[^'";]++|'[^']*+'|"[^"]*+")*+;""")
+QUOTE = re.compile(r"""['"]""")
+# A ';' that ends its line, whatever the quote state
+LINE_END_DELIMITER = re.compile(r";[ \t\r]*\n")
+
+def split_statements(chunks: Iterable[str]) -> Iterator[str]:
+    # Yields the text of each statement up to and including its ';', keeping
+    # only the statement in progress in memory. Quotes follow tokenize: a
+    # quoted string runs to the next matching quote character.
+    #
+    # A consumer that fails to parse a statement can send True back. When
+    # that statement's first line-ending ';' leaves a quote open (e.g. the
+    # backslash escape in 'O\'Brien'), quote tracking was thrown off and the
+    # "statement" swallowed the ones after it, so splitting starts over right
+    # after that ';' with quote tracking reset; see resync_point.
+    pending: list[str] = []
+    quote = None
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+
+    while (chunk is not None):
+        start = 0
+        pos = 0
+        length = len(chunk)
+        while (pos < length):
+            statement = None
+            if (quote is None and start == pos and not pending):
+                match = WHOLE_STATEMENT.match(chunk, pos)
+                if (match is not None):
+                    pos = start = match.end()
+                    statement = match.group()
+
+            if (statement is None):
+                if (quote is not None):
+                    end = chunk.find(quote, pos)
+                    if (end == -1):
+                        break
+                    quote = None
+                    pos = end + 1
+                    continue
+
+                match = STATEMENT_BOUNDARY.search(chunk, pos)
+                if (match is None):
+                    break
+                pos = match.end()
+                if (match.group() != ';'):
+                    quote = match.group()
+                    continue
+                pending.append(chunk[start:pos])
+                statement = ''.join(pending)
+                pending.clear()
+                start = pos
+
+            if ((yield statement)):
+                resync = resync_point(statement)
+                if (resync < len(statement)):
+                    chunk = statement[resync:] + chunk[pos:]
+                    start = pos = 0
+                    length = len(chunk)
+        if (start < length):
+            pending.append(chunk[start:])
+        chunk = next(chunks, None)
+
+        if (chunk is None and pending):
+            tail = ''.join(pending)
+            pending.clear()
+            if (tail.strip(' \n\t') and (yield tail)):
+                resync = resync_point(tail)
+                if (resync < len(tail)):
+                    quote = None
+                    chunk = tail[resync:]
+
+def resync_point(statement: str) -> int:
+    # Where a failed statement really ends: after its first line-ending ';'
+    # if the quotes before it don't pair up, otherwise at its end
+    match = LINE_END_DELIMITER.search(statement)
+    if (match is None or not quote_left_open(statement, match.start())):
+        return len(statement)
+    return match.end()
+
+def quote_left_open(text: str, end: int) -> bool:
+    quote = None
+    pos = 0
+    while (True):
+        if (quote is not None):
+            close = text.find(quote, pos, end)
+            if (close == -1):
+                return True
+            quote = None
+            pos = close + 1
+            continue
+        match = QUOTE.search(text, pos, end)
+        if (match is None):
+            return False
+        quote = match.group()
+        pos = match.end()
@@ -1,5 +1,5 @@
 from parser import Parser
-from lexer import tokenize
+from lexer import tokenize_file
 
 
 test_scripts_path = './test_scripts/'
@@ -20,7 +20,7 @@ CREATE TABLE users (
 
 
 def print_tokens():
-  tokens = tokenize(TEST_SQL)
+  tokens = tokenize_file(f'{test_scripts_path}shop_tables.sql')
   print(tokens)
 
 
@@ -35,7 +35,7 @@ def print_ast():
 
 def print_sql():
   prs = Parser()
-  val = prs.produce_ast(TEST_SQL)
+  val = prs.parse_file(f'{test_scripts_path}shop_tables.sql')
   print("ORIGINAL SQL\n")
   print(TEST_SQL)
   print("\nPARSED AST TO SQL\n")
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from abstract_syntax_tree import Schema
+from parser import Parser
+
+# Bump when the on-disk entry layout changes
+CACHE_FORMAT = 2
+ENTRY_SUFFIX = '.ast'
+TMP_SUFFIX = '.tmp'
+# A temp file this old belongs to a writer that died before renaming it
+STALE_TMP_SECONDS = 3600
+
+
+class ParseCache:
+    # Content-addressed cache of parsed schemas on disk. Entries are keyed by
+    # a hash of the parser class, its grammar_version, the entry point and the
+    # input bytes, so a grammar change can never serve a stale AST; old
+    # entries simply stop being read and age out. produce_ast and parse_file
+    # get separate entries because their lexers treat '\r' differently.
+    # Reads refresh an entry's mtime and the least recently used entries are
+    # evicted once the directory exceeds max_bytes. The directory is scanned
+    # once, when the cache is opened; from then on recency and the running
+    # total are tracked in memory, so stores never rescan it.
+    def __init__(self, directory: str | os.PathLike = '.origami_cache', max_bytes: int = 256 << 20,
+                 parser: Parser | None = None):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.parser = parser if parser is not None else Parser()
+        self.hits = 0
+        self.misses = 0
+        # entry path -> size in bytes, least recently used first
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.scan()
+
+    def produce_ast(self, sourceCode: str) -> Schema:
+        key = self.key('text', sourceCode.encode('utf-8'))
+        schema = self.load(key)
+        if schema is None:
+            schema = self.parser.produce_ast(sourceCode)
+            self.store(key, schema)
+        return schema
+
+    def parse_file(self, path: str | os.PathLike) -> Schema:
+        with open(path, 'rb') as f:
+            key = self.key('file', f)
+        schema = self.load(key)
+        if schema is None:
+            schema = self.parser.parse_file(path)
+            self.store(key, schema)
+        return schema
+
+    def key(self, entry: str, source) -> str:
+        parser_cls = type(self.parser)
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_FORMAT}:{parser_cls.__module__}.{parser_cls.__qualname__}:{parser_cls.grammar_version}:{entry}\0".encode())
+        if isinstance(source, bytes):
+            digest.update(source)
+        else:
+            for block in iter(lambda: source.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def load(self, key: str) -> Schema | None:
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            schema = Schema.from_bytes(data)
+            os.utime(path)
+            self.track(path, len(data))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # A truncated or foreign entry is treated as a miss and replaced
+            self.misses += 1
+            self.discard(path)
+            return None
+        self.hits += 1
+        return schema
+
+    def store(self, key: str, schema: Schema):
+        data = schema.to_bytes()
+        path = self.entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        self.track(path, len(data))
+        self.evict()
+
+    def scan(self):
+        # Indexes the entries already on disk by mtime. Temp files left behind
+        # by a crashed writer count towards max_bytes and are evicted like
+        # entries; fresh ones may still be renamed by a live writer.
+        found = []
+        stale_before = time.time() - STALE_TMP_SECONDS
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                is_tmp = entry.name.endswith(TMP_SUFFIX)
+                if not (is_tmp or entry.name.endswith(ENTRY_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if is_tmp and stat.st_mtime > stale_before:
+                    continue
+                found.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        found.sort()
+        for _, size, path in found:
+            self.track(path, size)
+        self.evict()
+
+    def track(self, path: str, size: int):
+        # Marks path as the most recently used entry
+        self.total_bytes += size - self.entries.pop(path, 0)
+        self.entries[path] = size
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, path: str):
+        self.total_bytes -= self.entries.pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
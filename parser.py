@@ -1,60 +1,238 @@
-from abstract_syntax_tree import Node, Schema, ColumnDef, AlterOperation, AlterTable, Table, Insert, ValueLiteral, UpdateCondition, Update, CreateTable, ForeignKeyConstraint, PrimaryKeyConstraint
-from lexer import TokenType, Token, tokenize
-from typing import Any
-from pydantic import BaseModel
-from base_parser import BaseParser
+from abstract_syntax_tree import Node, Schema, ColumnDef, AlterOperation, AlterTable, Table, Insert, ValueLiteral, ValueRows, UpdateCondition, Update, CreateTable, ForeignKeyConstraint, PrimaryKeyConstraint
+from lexer import TokenType, Token, iter_tokens, iter_tokens_bytes, map_file, resync_point, split_statements
+from typing import Any, Callable, Generator, Iterable, Iterator, TextIO
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from operator import methodcaller
+import os
+import re
+from base_parser import BaseParser, FAIL
+from profiling import CountingTokenStream, ParseStats
+from token_stream import TokenStream
+from time import perf_counter
+
+@dataclass(slots=True, frozen=True)
+class Diagnostic:
+    message: str
+    # where the failed statement starts in the source: character offset
+    # and 1-based line
+    offset: int
+    line: int
+
+
+# Parses one statement starting at the parser's current token
+StatementHandler = Callable[['Parser'], Node | None]
 
-class ParseResult(BaseModel):
-    value: Any = None
-    is_optional: bool = False
 
 class Parser(BaseParser):
-    tokens: list[Token] = []
+    # Bump whenever a grammar or AST change alters what a given input parses
+    # to; persisted parse results are keyed on it
+    grammar_version: int = 1
+
+    # Leading token value -> {second token value or None: handler}. Each
+    # subclass gets its own copy, so registering on it never leaks upward.
+    statement_handlers: dict[str, dict[str | None, StatementHandler]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.statement_handlers = {keyword: dict(handlers) for keyword, handlers in cls.statement_handlers.items()}
 
+    @classmethod
+    def register_statement(cls, keyword: str, handler: StatementHandler, second: str | None = None) -> StatementHandler:
+        # A handler registered with a second token wins over the keyword's
+        # default (second=None) when both leading tokens match
+        cls.statement_handlers.setdefault(keyword, {})[second] = handler
+        return handler
+
+    def __init__(self, statement_cache_size: int = 0, profile: bool = False):
+        super().__init__()
+        # produce_ast_parallel builds its worker parsers with the same options
+        self.options = {'statement_cache_size': statement_cache_size, 'profile': profile}
+        self.statement_cache = StatementCache(statement_cache_size) if statement_cache_size > 0 else None
+        if profile:
+            self.stats = ParseStats()
+            # built here so the first statement's timings don't include it
+            self.profiled_grammar()
 
     def produce_ast(self, sourceCode: str) -> Schema:
         schema:Schema = Schema()
-        self.tokens = tokenize(sourceCode)
+        if self.statement_cache is None:
+            schema.body.extend(self.parse_nodes(self.tokenize(iter_tokens, sourceCode)))
+        else:
+            schema.body.extend(self.iter_statements(sourceCode))
+        return schema
 
-        while (self.not_eof()): 
-            node = self.parse_node()
-            if node is not None:
-                schema.body.append(node)
+    def parse_file(self, path: str) -> Schema:
+        schema:Schema = Schema()
+        # Lexing straight off the mapping rather than through iter_tokens_file
+        # saves a generator hop per token
+        with map_file(path) as data:
+            tokens = self.tokenize(iter_tokens_bytes, data)
+            try:
+                schema.body.extend(self.parse_nodes(tokens))
+            finally:
+                # the parser stops at EOF without exhausting the lexer, whose
+                # last match still points into the mapping
+                if isinstance(tokens, Generator):
+                    tokens.close()
+        return schema
+
+    def tokenize(self, lexer: Callable[[Any], Iterator[Token]], source) -> Iterable[Token]:
+        # Lexing interleaves with parsing, except under profiling where the
+        # tokens are listed up front so the lexer is timed on its own
+        if self.stats is None:
+            return lexer(source)
+        try:
+            return self.stats.time('tokenize', list, lexer(source))
+        except Exception:
+            # the input never reaches the parser, so it counts as one failed
+            # statement of no tokens
+            self.stats.record_statement('FAILED', 0.0, 0.0, 0)
+            raise
+
+    def iter_statements(self, source: TextIO | Iterable[str] | str, chunk_size: int = 1 << 16) -> Iterator[Node]:
+        for statement in split_statements(read_chunks(source, chunk_size)):
+            yield from self.parse_statement(statement)
+
+    def parse_statement(self, statement: str) -> Iterable[Node]:
+        cache = self.statement_cache
+        if cache is None:
+            return self.parse_nodes(self.tokenize(iter_tokens, statement))
+
+        if len(statement) > cache.max_statement_length:
+            cache.skipped += 1
+            return self.parse_nodes(self.tokenize(iter_tokens, statement))
+
+        key = normalize_statement(statement)
+        nodes = cache.get(key)
+        if nodes is None:
+            nodes = list(self.parse_nodes(self.tokenize(iter_tokens, statement)))
+            cache.put(key, nodes)
+        return nodes
+
+    def produce_ast_resilient(self, source: TextIO | Iterable[str] | str,
+                              chunk_size: int = 1 << 16) -> tuple[Schema, list['Diagnostic']]:
+        # Parses statement by statement; one that fails to lex or parse is
+        # recorded and skipped up to its closing ';' instead of aborting
+        schema:Schema = Schema()
+        errors: list[Diagnostic] = []
+        offset = 0
+        line = 1
+
+        statements = split_statements(read_chunks(source, chunk_size))
+        failed = None
+        while (True):
+            try:
+                # telling the splitter about a failure lets it resync when
+                # the failed statement's quotes were out of step
+                statement = statements.send(failed)
+            except StopIteration:
+                break
+            failed = None
+            try:
+                schema.body.extend(tuple(self.parse_statement(statement)))
+            except Exception as e:
+                failed = True
+                statement = statement[:resync_point(statement)]
+                indent = len(statement) - len(statement.lstrip(' \n\t'))
+                errors.append(Diagnostic(
+                    message=' '.join(str(e).split()),
+                    offset=offset + indent,
+                    line=line + statement.count('\n', 0, indent)
+                ))
+            offset += len(statement)
+            line += statement.count('\n')
+
+        return schema, errors
+
+    def produce_ast_parallel(self, source: TextIO | Iterable[str] | str, max_workers: int | None = None,
+                             batch_size: int = 1 << 20, chunk_size: int = 1 << 16) -> Schema:
+        schema:Schema = Schema()
+        max_workers = max_workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Bound the batches in flight so reading stays ahead of the
+            # workers without pulling the whole input into memory
+            in_flight = deque()
+            for batch in batch_statements(split_statements(read_chunks(source, chunk_size)), batch_size):
+                in_flight.append(executor.submit(parse_batch, type(self), self.options, batch))
+                if len(in_flight) >= max_workers * 2:
+                    schema.body.extend(self.collect_batch(in_flight.popleft().result()))
+            while in_flight:
+                schema.body.extend(self.collect_batch(in_flight.popleft().result()))
 
         return schema
 
+    def collect_batch(self, result: 'BatchResult') -> list[Node]:
+        # Worker stats and cache counters are added to this parser's own
+        nodes, stats, hits, misses = result
+        if stats is not None and self.stats is not None:
+            self.stats.merge(stats)
+        if self.statement_cache is not None:
+            self.statement_cache.hits += hits
+            self.statement_cache.misses += misses
+        return nodes
+
+    def parse_nodes(self, tokens: Iterable[Token]) -> Iterator[Node]:
+        stats = self.stats
+        self.stream = TokenStream(tokens) if stats is None else CountingTokenStream(tokens, stats)
+
+        while (self.not_eof()): 
+            # memo entries are keyed by position, so they never outlive a
+            # statement, and neither do a streamed input's buffered tokens
+            self.memo_table.clear()
+            self.stream.release()
+            node = self.parse_node() if stats is None else self.parse_node_profiled(stats)
+            if node is None:
+                raise ValueError(f"Unable to parse statement starting at: {self.curr_token()}")
+            yield node
+
     def not_eof(self) -> bool:
         return self.curr_type() != TokenType.EOF
     
     def parse_node(self) -> Node | None:
-        if self.is_keyword():
-            if self.curr_value() == 'CREATE':
-                return self.parse_create_statement()
-            elif self.curr_value() == 'ALTER':
-                return self.parse_alter_statement()
-            elif self.curr_value() == 'INSERT':
-                return self.parse_insert_statement()
-            elif self.curr_value() == 'UPDATE':
-                return self.parse_update_statement()
-         
-        
+        handlers = self.statement_handlers.get(self.curr_value())
+        if handlers is not None:
+            handler = None
+            # only keywords with second-token entries pay for the lookahead
+            if len(handlers) > 1 or None not in handlers:
+                handler = handlers.get(self.stream.peek().value)
+            if handler is None:
+                handler = handlers.get(None)
+            if handler is not None:
+                return handler(self)
+
         raise ValueError(f"Unexpected token: {self.curr_token()}")
     
+    def parse_node_profiled(self, stats: ParseStats) -> Node | None:
+        start_pos = self.stream.mark()
+        grammar_seconds = stats.grammar_seconds
+        start = perf_counter()
+        node = None
+        try:
+            node = self.parse_node()
+            return node
+        finally:
+            # statements that raise are recorded as failed too
+            elapsed = perf_counter() - start
+            statement_type = node.type.name if node is not None else 'FAILED'
+            stats.record_statement(statement_type, elapsed, stats.grammar_seconds - grammar_seconds,
+                                   self.stream.mark() - start_pos)
+
     def parse_update_statement(self) -> Node | None:
-        update_parser = self.update()
-        
-        pr = update_parser()
-        if pr.value is None:
+        pr = self.rule('update')
+        if pr is FAIL:
             return None
             
-        tbl   = pr.value["table"]
-        col   = pr.value["col"] 
-        op    = pr.value["op"].value
-        val   = pr.value["value"]
+        tbl   = pr["table"]
+        col   = pr["col"] 
+        op    = pr["op"].value
+        val   = pr["value"]
         
 
         conditions = []
-        for condition in pr.value["conditions"]:
+        for condition in pr["conditions"]:
             cc = condition["cond_col"]
             cop = condition["cond_op"].value
             cv = condition["cond_val"]
@@ -75,93 +253,88 @@ class Parser(BaseParser):
     
         
     def parse_insert_statement(self) -> Node | None:
-        insert_parser = self.insert()
-        pr = insert_parser()
+        start = self.stream.mark()
+        pr = self.rule('insert')
         
-        if pr.value is None:
+        if pr is FAIL:
             return None
         
-        table_name = pr.value["table_name"]
-        columns = pr.value["columns"]
-        all_values = pr.value["values"]
+        table_name = pr["table_name"]
+        columns = pr["columns"]
+        values = self.scan_value_rows(len(columns))
+        if values is None:
+            self.stream.rewind(start)
+            return None
         
-        for values in all_values:
-            if len(columns) != len(values):
+        return Insert(table_name=table_name, columns=columns, values=values)
+
+    def scan_value_rows(self, width: int) -> ValueRows | None:
+        # Bulk INSERTs are most of a data dump, so their value tuples are read
+        # in one loop over the statement's buffered tokens instead of through
+        # the combinators
+        tokens = self.stream.fill_statement()
+        pos = self.stream.mark()
+        cells: list[str] = []
+
+        while True:
+            if tokens[pos].type != TokenType.LEFT_PAREN:
+                return None
+            pos += 1
+            row_start = len(cells)
+            while True:
+                token = tokens[pos]
+                if token.type != TokenType.LITERAL:
+                    return None
+                cells.append(token.value)
+                token = tokens[pos + 1]
+                pos += 2
+                if token.type == TokenType.RIGHT_PAREN:
+                    break
+                if token.type != TokenType.DELIMITER or token.value != ',':
+                    return None
+
+            if len(cells) - row_start != width:
                 raise Exception("Columns and values have mismatched lengths")
-            
-        value_literals = []
-        for val_list in all_values:
-            inner_value_literals = []
-            for val in val_list:
-                inner_value_literals.append(ValueLiteral(value=val))
-            value_literals.append(inner_value_literals)
-        
-        return Insert(table_name=table_name, columns=columns, values=value_literals)
 
-   
+            token = tokens[pos]
+            pos += 1
+            if token.type != TokenType.DELIMITER:
+                return None
+            if token.value == ';':
+                break
+            if token.value != ',':
+                return None
 
-    def parse_column_list(self):
-        def parser():
-            column_list_parser = self.sequence(
-                self.token_type(TokenType.LEFT_PAREN),
-                self.many(self.identifier(), self.delimiter(",")),
-                self.token_type(TokenType.RIGHT_PAREN),
-            )
-            parse_result = column_list_parser()
-            if parse_result.value is None:
-                return ParseResult
-            return ParseResult(value=parse_result.value[1])
-        return parser
-    
-    def parse_value_list(self):
-        def parser():
-            value_list_parser = self.sequence(
-                self.token_type(TokenType.LEFT_PAREN),
-                self.many(self.literal(), self.delimiter(",")),
-                self.token_type(TokenType.RIGHT_PAREN)
-            )
-            parse_result = value_list_parser()
-            if parse_result.value is None:
-                return ParseResult()
-            
-            return ParseResult(value=parse_result.value[1])
+        self.stream.rewind(pos)
+        return ValueRows(cells, width)
+
+    @classmethod
+    def parse_column_list(cls):
+        column_list_parser = cls.sequence(
+            cls.token_type(TokenType.LEFT_PAREN),
+            cls.many(cls.identifier(), cls.delimiter(",")),
+            cls.token_type(TokenType.RIGHT_PAREN),
+        )
+        def parser(p):
+            parse_result = column_list_parser(p)
+            if parse_result is FAIL:
+                return FAIL
+            return parse_result[1]
         return parser
     
-    def parse_value_lists(self):
-        def parser():
-            value_list_parser = self.sequence(
-                self.label("value_lists", 
-                    self.many(
-                        self.parse_value_list(),
-                        self.delimiter(",")
-                    )
-                ),
-                self.delimiter(";")
-            )
-            
-            result = value_list_parser()
-            if result.value is None:
-                return ParseResult()
-            
-            return ParseResult(value=result.value["value_lists"])
-        
-        return parser
-                
-
-
     def parse_create_statement(self) -> Node | None:
-        pr = self.create_table()()
-        if pr.value is None:
+        pr = self.rule('create_table')
+        if pr is FAIL:
             return None
         
-        table_name = pr.value["table_name"]
+        table_name = pr["table_name"]
         table = Table(name=table_name)
         create_stmt = CreateTable(table=table)
         
-        if "conditional_clause" in pr.value:
-            create_stmt.condition_clauses = pr.value["conditional_clause"]
+        if "conditional_clause" in pr:
+            create_stmt.condition_clauses = pr["conditional_clause"]
         
-        for element in pr.value["table_elements"]:
+        for element in pr["table_elements"]:
             if "column_name" in element:
                 datatype = element["datatype"].value
                 if "size_params" in element:
@@ -198,14 +371,12 @@ class Parser(BaseParser):
     
     
     def parse_alter_statement(self) -> Node | None:
-        alter_parser = self.alter_table()
-
-        pr = alter_parser()
-        if pr.value is None:
+        pr = self.rule('alter_table')
+        if pr is FAIL:
             return None
         
-        table_name = pr.value["table_name"]
-        operations = pr.value["operations"]
+        table_name = pr["table_name"]
+        operations = pr["operations"]
         
         table = Table(name=table_name)
         alter_stmt = AlterTable(table=table)
@@ -245,5 +416,96 @@ class Parser(BaseParser):
         return alter_stmt
 
 
+# Built-in statements dispatch through methodcaller so subclasses that
+# override a parse_*_statement method are still routed to their version
+Parser.register_statement('CREATE', methodcaller('parse_create_statement'))
+Parser.register_statement('ALTER', methodcaller('parse_alter_statement'))
+Parser.register_statement('INSERT', methodcaller('parse_insert_statement'))
+Parser.register_statement('UPDATE', methodcaller('parse_update_statement'))
+
+
+def read_chunks(source: TextIO | Iterable[str] | str, chunk_size: int) -> Iterable[str]:
+    if isinstance(source, str):
+        return [source]
+    if hasattr(source, 'read'):
+        return iter(lambda: source.read(chunk_size), '')
+    return source
+
+def batch_statements(statements: Iterable[str], batch_size: int) -> Iterator[str]:
+    batch: list[str] = []
+    size = 0
+    for statement in statements:
+        batch.append(statement)
+        size += len(statement)
+        if size >= batch_size:
+            yield ''.join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield ''.join(batch)
+
+# nodes, the batch's stats if profiling, statement cache hits and misses
+BatchResult = tuple[list[Node], ParseStats | None, int, int]
+
+# One parser per class and options in each worker process, so a worker's
+# statement cache carries over from one batch to the next
+worker_parsers: dict[tuple[type[Parser], tuple[tuple[str, Any], ...]], Parser] = {}
+
+def parse_batch(parser_cls: type[Parser], options: dict[str, Any], text: str) -> BatchResult:
+    # Runs in a worker process, so it has to be a picklable module-level function
+    key = (parser_cls, tuple(sorted(options.items())))
+    parser = worker_parsers.get(key)
+    if parser is None:
+        parser = worker_parsers[key] = parser_cls(**options)
+    if parser.stats is not None:
+        parser.stats = ParseStats()
+    cache = parser.statement_cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    nodes = parser.produce_ast(text).body
+    if cache is not None:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return nodes, parser.stats, hits, misses
+
+
+# Statements longer than this are parsed without the statement cache. Big
+# statements are nearly always one-off data (bulk INSERTs), and keying and
+# encoding them would cost time and pin their text and nodes in memory.
+STATEMENT_CACHE_MAX_LENGTH = 8 << 10
+
+class StatementCache:
+    # Bounded LRU from normalized statement text to the nodes it parsed to.
+    # Entries hold the nodes in their binary form and every hit decodes a
+    # fresh copy, so callers may mutate what they get back. With both
+    # limits, an entry holds at most a few times max_statement_length bytes.
+    def __init__(self, maxsize: int, max_statement_length: int = STATEMENT_CACHE_MAX_LENGTH):
+        self.maxsize = maxsize
+        self.max_statement_length = max_statement_length
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # statements too long to be cached
+        self.skipped = 0
+
+    def get(self, key: str) -> list[Node] | None:
+        data = self.entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return Schema.from_bytes(data).body
+
+    def put(self, key: str, nodes: Iterable[Node]):
+        self.entries[key] = Schema(body=list(nodes)).to_bytes()
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
 
+STATEMENT_WHITESPACE = re.compile(r"""('[^']*'|"[^"]*")|[ \t\n]+""")
 
+def normalize_statement(statement: str) -> str:
+    # Collapses whitespace between tokens; quoted literals are kept verbatim
+    return STATEMENT_WHITESPACE.sub(lambda m: m.group(1) or ' ', statement).strip(' ')
@@ -0,0 +1,131 @@
+import json
+from collections import Counter
+from time import perf_counter
+from typing import Any, Callable, TextIO
+from token_stream import TokenStream
+
+
+class StatementStats:
+    __slots__ = ('count', 'seconds', 'grammar_seconds', 'tokens')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.grammar_seconds = 0.0
+        self.tokens = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'seconds': self.seconds,
+            'grammar_seconds': self.grammar_seconds,
+            'build_seconds': self.seconds - self.grammar_seconds,
+            'tokens': self.tokens,
+        }
+
+
+class ParseStats:
+    # Opt-in counters for one parser (and whatever Schema calls it is passed
+    # to). Parsers without stats never touch this, so profiling costs nothing
+    # unless it is asked for. Time inside the grammar rules is tracked apart
+    # from the statement total; the remainder is AST construction.
+    def __init__(self):
+        self.stages: Counter[str] = Counter()
+        self.statements: dict[str, StatementStats] = {}
+        self.combinator_calls: Counter[str] = Counter()
+        self.backtracks = 0
+        self.grammar_seconds = 0.0
+
+    def time(self, stage: str, fn: Callable[..., Any], *args) -> Any:
+        start = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.stages[stage] += perf_counter() - start
+
+    def record_statement(self, statement_type: str, seconds: float, grammar_seconds: float, tokens: int):
+        stats = self.statements.get(statement_type)
+        if stats is None:
+            stats = self.statements[statement_type] = StatementStats()
+        stats.count += 1
+        stats.seconds += seconds
+        stats.grammar_seconds += grammar_seconds
+        stats.tokens += tokens
+        self.stages['parse'] += seconds
+
+    def merge(self, other: 'ParseStats'):
+        # Folds in the counters of another parser, e.g. a parallel worker's
+        self.stages.update(other.stages)
+        for statement_type, other_stats in other.statements.items():
+            stats = self.statements.get(statement_type)
+            if stats is None:
+                stats = self.statements[statement_type] = StatementStats()
+            stats.count += other_stats.count
+            stats.seconds += other_stats.seconds
+            stats.grammar_seconds += other_stats.grammar_seconds
+            stats.tokens += other_stats.tokens
+        self.combinator_calls.update(other.combinator_calls)
+        self.backtracks += other.backtracks
+        self.grammar_seconds += other.grammar_seconds
+
+    @property
+    def tokens(self) -> int:
+        return sum(stats.tokens for stats in self.statements.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'stages': dict(self.stages),
+            'statements': {name: stats.to_dict() for name, stats in self.statements.items()},
+            'tokens': self.tokens,
+            'combinator_calls': dict(self.combinator_calls),
+            'backtracks': self.backtracks,
+        }
+
+    def to_json(self, indent: int | None = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def folded_stacks(self) -> list[str]:
+        # Brendan Gregg's folded format, one "frame;frame microseconds" line per
+        # stack, which flamegraph.pl, speedscope and inferno all read
+        lines = []
+        for stage, seconds in self.stages.items():
+            if stage != 'parse':
+                lines.append(f"{stage} {round(seconds * 1e6)}")
+        for name, stats in self.statements.items():
+            lines.append(f"parse;{name};grammar {round(stats.grammar_seconds * 1e6)}")
+            lines.append(f"parse;{name};build {round((stats.seconds - stats.grammar_seconds) * 1e6)}")
+        return lines
+
+    def write_folded(self, fp: TextIO):
+        for line in self.folded_stacks():
+            fp.write(line)
+            fp.write('\n')
+
+
+class CountingTokenStream(TokenStream):
+    # Counts every rewind that moves the stream backwards
+    def __init__(self, tokens, stats: ParseStats):
+        super().__init__(tokens)
+        self.stats = stats
+
+    def rewind(self, mark: int):
+        if mark < self.pos:
+            self.stats.backtracks += 1
+        self.pos = mark
+
+
+def count_calls(kind: str, parser):
+    def counted(p):
+        p.stats.combinator_calls[kind] += 1
+        return parser(p)
+    return counted
+
+def time_rule(rule):
+    def timed(p):
+        stats = p.stats
+        start = perf_counter()
+        try:
+            return rule(p)
+        finally:
+            stats.grammar_seconds += perf_counter() - start
+    return timed
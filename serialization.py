@@ -0,0 +1,270 @@
+import sys
+from array import array
+from abstract_syntax_tree import (
+    AlterOperation, AlterTable, ColumnDef, CreateTable, ForeignKeyConstraint, Insert, Node,
+    PrimaryKeyConstraint, Schema, Table, Update, UpdateCondition, ValueLiteral, ValueRows,
+)
+
+# Layout, all integers unsigned LEB128 varints unless noted:
+#   b"ORGM" | format version (1 byte)
+#   string count | string lengths in characters (uint32 little endian each)
+#   utf-8 byte length | utf-8 blob of every string concatenated
+#   node count | tagged node records
+# Strings are stored once and referenced by index everywhere else. INSERT
+# cells are a flat array of 1, 2 or 4 byte indexes, read straight out of the
+# input buffer on load.
+MAGIC = b'ORGM'
+FORMAT_VERSION = 1
+
+TAG_CREATE_TABLE = 1
+TAG_ALTER_TABLE = 2
+TAG_INSERT = 3
+TAG_UPDATE = 4
+TAG_TABLE = 5
+TAG_COLUMN_DEF = 6
+TAG_PRIMARY_KEY = 7
+TAG_FOREIGN_KEY = 8
+
+INDEX_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+
+class Encoder:
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.out = bytearray()
+
+    def uint(self, value: int):
+        out = self.out
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def ref(self, string: str) -> int:
+        index = self.strings.get(string)
+        if index is None:
+            index = len(self.strings)
+            self.strings[string] = index
+        return index
+
+    def string(self, string: str):
+        self.uint(self.ref(string))
+
+    def optional_string(self, string: str | None):
+        # 0 stands for None, anything else is the string index plus one
+        self.uint(0 if string is None else self.ref(string) + 1)
+
+    def strings_list(self, strings: list[str]):
+        self.uint(len(strings))
+        for string in strings:
+            self.string(string)
+
+    def column(self, column: ColumnDef):
+        self.string(column.name)
+        self.string(column.datatype)
+        self.strings_list(column.constraints)
+
+    def node(self, node: Node):
+        if isinstance(node, CreateTable):
+            self.out.append(TAG_CREATE_TABLE)
+            self.string(node.table.name)
+            self.strings_list(node.condition_clauses)
+            self.uint(len(node.columns))
+            for column in node.columns:
+                self.column(column)
+            self.uint(len(node.table_constraints))
+            for constraint in node.table_constraints:
+                self.node(constraint)
+        elif isinstance(node, AlterTable):
+            self.out.append(TAG_ALTER_TABLE)
+            self.string(node.table.name)
+            self.uint(len(node.operations))
+            for op in node.operations:
+                self.string(op.action)
+                self.column(op.column)
+        elif isinstance(node, Insert):
+            self.out.append(TAG_INSERT)
+            self.string(node.table_name)
+            self.strings_list(node.columns)
+            self.insert_cells(node.values)
+        elif isinstance(node, Update):
+            self.out.append(TAG_UPDATE)
+            self.string(node.table_name)
+            self.strings_list(node.columns)
+            self.strings_list([value.value for value in node.values])
+            self.uint(len(node.conditions))
+            for condition in node.conditions:
+                self.string(condition.column)
+                self.string(condition.operator)
+                self.string(condition.value.value)
+        elif isinstance(node, Table):
+            self.out.append(TAG_TABLE)
+            self.string(node.name)
+        elif isinstance(node, ColumnDef):
+            self.out.append(TAG_COLUMN_DEF)
+            self.column(node)
+        elif isinstance(node, PrimaryKeyConstraint):
+            self.out.append(TAG_PRIMARY_KEY)
+            self.string(node.column_name)
+        elif isinstance(node, ForeignKeyConstraint):
+            self.out.append(TAG_FOREIGN_KEY)
+            self.optional_string(node.name)
+            self.string(node.column_name)
+            self.string(node.referenced_table)
+            self.string(node.referenced_column)
+        else:
+            raise ValueError(f"Cannot serialize node of type {node.type}")
+
+    def insert_cells(self, values: ValueRows):
+        indexes = [self.ref(cell) for cell in values.cells]
+        self.uint(values.width)
+        self.uint(len(indexes))
+        largest = max(indexes, default=0)
+        size = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+        cells = array(INDEX_TYPECODES[size], indexes)
+        if sys.byteorder != 'little':
+            cells.byteswap()
+        self.out.append(size)
+        self.out += cells.tobytes()
+
+    def finish(self, node_count: int) -> bytes:
+        body = self.out
+        self.out = bytearray(MAGIC)
+        self.out.append(FORMAT_VERSION)
+        strings = list(self.strings)
+        self.uint(len(strings))
+        lengths = array('I', [len(string) for string in strings])
+        if sys.byteorder != 'little':
+            lengths.byteswap()
+        self.out += lengths.tobytes()
+        blob = ''.join(strings).encode('utf-8')
+        self.uint(len(blob))
+        self.out += blob
+        self.uint(node_count)
+        return bytes(self.out + body)
+
+
+class Decoder:
+    def __init__(self, data):
+        self.view = memoryview(data).cast('B')
+        self.pos = 0
+        self.strings: list[str] = []
+
+    def uint(self) -> int:
+        view = self.view
+        pos = self.pos
+        byte = view[pos]
+        pos += 1
+        value = byte & 0x7F
+        shift = 7
+        while byte & 0x80:
+            byte = view[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        self.pos = pos
+        return value
+
+    def take(self, size: int) -> memoryview:
+        start = self.pos
+        self.pos += size
+        if self.pos > len(self.view):
+            raise ValueError("Truncated schema data")
+        return self.view[start:self.pos]
+
+    def index_array(self, size: int, count: int):
+        raw = self.take(size * count)
+        if sys.byteorder == 'little':
+            return raw.cast(INDEX_TYPECODES[size])
+        indexes = array(INDEX_TYPECODES[size], raw)
+        indexes.byteswap()
+        return indexes
+
+    def string(self) -> str:
+        return self.strings[self.uint()]
+
+    def optional_string(self) -> str | None:
+        index = self.uint()
+        return None if index == 0 else self.strings[index - 1]
+
+    def strings_list(self) -> list[str]:
+        return [self.string() for _ in range(self.uint())]
+
+    def column(self) -> ColumnDef:
+        return ColumnDef(name=self.string(), datatype=self.string(), constraints=self.strings_list())
+
+    def header(self):
+        if bytes(self.take(len(MAGIC))) != MAGIC:
+            raise ValueError("Not serialized schema data")
+        version = self.take(1)[0]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported schema format version {version}")
+
+        lengths = self.index_array(4, self.uint())
+        blob = str(self.take(self.uint()), 'utf-8')
+        strings = self.strings
+        start = 0
+        for length in lengths:
+            strings.append(blob[start:start + length])
+            start += length
+
+    def node(self) -> Node:
+        tag = self.take(1)[0]
+        if tag == TAG_CREATE_TABLE:
+            create = CreateTable(table=Table(name=self.string()), condition_clauses=self.strings_list())
+            create.columns = [self.column() for _ in range(self.uint())]
+            create.table_constraints = [self.node() for _ in range(self.uint())]
+            return create
+        if tag == TAG_ALTER_TABLE:
+            alter = AlterTable(table=Table(name=self.string()))
+            for _ in range(self.uint()):
+                alter.operations.append(AlterOperation(action=self.string(), column=self.column()))
+            return alter
+        if tag == TAG_INSERT:
+            table_name = self.string()
+            columns = self.strings_list()
+            width = self.uint()
+            count = self.uint()
+            size = self.take(1)[0]
+            strings = self.strings
+            cells = [strings[index] for index in self.index_array(size, count)]
+            return Insert(table_name=table_name, columns=columns, values=ValueRows(cells, width))
+        if tag == TAG_UPDATE:
+            update = Update(table_name=self.string(), columns=self.strings_list())
+            update.values = [ValueLiteral(value=value) for value in self.strings_list()]
+            for _ in range(self.uint()):
+                update.conditions.append(UpdateCondition(
+                    column=self.string(),
+                    operator=self.string(),
+                    value=ValueLiteral(value=self.string())
+                ))
+            return update
+        if tag == TAG_TABLE:
+            return Table(name=self.string())
+        if tag == TAG_COLUMN_DEF:
+            return self.column()
+        if tag == TAG_PRIMARY_KEY:
+            return PrimaryKeyConstraint(column_name=self.string())
+        if tag == TAG_FOREIGN_KEY:
+            return ForeignKeyConstraint(
+                name=self.optional_string(),
+                column_name=self.string(),
+                referenced_table=self.string(),
+                referenced_column=self.string()
+            )
+        raise ValueError(f"Unknown node tag {tag}")
+
+
+def dump_schema(schema: Schema) -> bytes:
+    encoder = Encoder()
+    for item in schema.body:
+        encoder.node(item)
+    return encoder.finish(len(schema.body))
+
+def load_schema(data) -> Schema:
+    # data can be bytes or any buffer, e.g. an mmap; it is read in place
+    decoder = Decoder(data)
+    decoder.header()
+    schema = Schema()
+    schema.body = [decoder.node() for _ in range(decoder.uint())]
+    return schema
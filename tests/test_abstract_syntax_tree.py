@@ -0,0 +1,144 @@
+import sys
+import os
+import io
+import copy
+import pytest
+from pydantic import ValidationError
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+from abstract_syntax_tree import ColumnDef, CreateTable, Insert, NodeType, Schema, SchemaFolder, Table, ValueLiteral
+
+
+test_scripts_path = './test_scripts/'
+
+shop_tables = open(f'{test_scripts_path}shop_tables.sql')
+sql5 = shop_tables.read()
+
+
+def test_nodes_are_slotted():
+    column = ColumnDef(name='id', datatype='INT')
+    assert not hasattr(column, '__dict__')
+    with pytest.raises(AttributeError):
+        column.nullable = True
+
+def test_json_round_trip():
+    schema = Parser().produce_ast(sql5)
+
+    loaded = Schema.from_json(schema.to_json())
+
+    assert loaded == schema
+    assert str(schema) == schema.to_json(indent=1)
+
+def test_binary_round_trip():
+    schema = Parser().produce_ast(sql5 + """
+        INSERT INTO users (id, name) VALUES (1, 'ann'), (2, 'bob');
+        UPDATE users SET name = 'cy' WHERE id = 2;
+        ALTER TABLE users ADD COLUMN email VARCHAR(255) NOT NULL, DROP COLUMN name;
+    """)
+
+    data = schema.to_bytes()
+
+    assert Schema.from_bytes(data) == schema
+    assert Schema.from_bytes(memoryview(data)) == schema
+    assert len(data) < len(schema.to_json())
+    with pytest.raises(ValueError):
+        Schema.from_bytes(b'JSON' + data[4:])
+
+def test_insert_accepts_nested_value_lists():
+    insert = Insert(table_name='t', columns=['a', 'b'], values=[
+        [ValueLiteral(value='1'), ValueLiteral(value="'x'")],
+        [ValueLiteral(value='2'), ValueLiteral(value="'y'")],
+    ])
+    schema = Schema(body=[insert])
+
+    assert insert.sql() == "INSERT INTO t (a, b) VALUES\n(1, 'x'),\n(2, 'y');"
+    assert Schema.from_bytes(schema.to_bytes()) == schema
+    assert Schema.from_json(str(schema)) == schema
+    with pytest.raises(ValueError):
+        Insert(table_name='t', values=[[ValueLiteral(value='1')], []])
+
+def test_insert_rows_are_read_only_copies_replaced_through_values():
+    insert = Parser().produce_ast("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z');").body[0]
+    values = insert.values
+
+    with pytest.raises(AttributeError):
+        values[0][0].value = '9'
+    with pytest.raises(TypeError):
+        values[0][0] = ValueLiteral(value='9')
+    assert values[0][0] == ValueLiteral(value='1') and ValueLiteral(value='1') == values[0][0]
+    assert copy.deepcopy(values[0]) == values[0]
+    assert [row[0].value for row in values[1:]] == ['2', '3']
+    assert [row[0].value for row in values[::-2]] == ['3', '1']
+
+    values[0] = [ValueLiteral(value='9'), "'w'"]
+    del values[1]
+    values.append(['4', "'v'"])
+    values[1:2] = [['5', "'u'"], ['6', "'s'"]]
+    values.insert(0, ['0', "'r'"])
+
+    assert insert.sql() == "INSERT INTO t (a, b) VALUES\n(0, 'r'),\n(9, 'w'),\n(5, 'u'),\n(6, 's'),\n(4, 'v');"
+    with pytest.raises(ValueError):
+        values.append(['7'])
+    with pytest.raises(IndexError):
+        values[5] = ['7', "'q'"]
+
+def test_validate_is_opt_in():
+    create = CreateTable(table=Table(name='users'), columns=[ColumnDef(name='id', datatype=11)])
+    schema = Schema(body=[create])
+
+    assert schema.body[0].columns[0].datatype == 11
+    with pytest.raises(ValidationError):
+        schema.validate()
+
+def test_fold_applies_alters_in_order():
+    schema = Parser().produce_ast("""
+    ALTER TABLE users ADD COLUMN early INT;
+    CREATE TABLE users (id INT, name VARCHAR(64));
+    ALTER TABLE users ADD COLUMN email TEXT, DROP COLUMN name, ADD COLUMN name TEXT;
+    ALTER TABLE users DROP COLUMN missing, ADD COLUMN email INT;
+    ALTER TABLE teams ADD COLUMN title TEXT;
+    INSERT INTO users (id) VALUES (1);
+    """)
+    original_columns = list(schema.body[1].columns)
+
+    folded = schema.fold()
+
+    assert [node.type.value for node in folded.body] == ['create_table', 'insert', 'alter_table']
+    assert [(col.name, col.datatype) for col in folded.body[0].columns] == [
+        ('id', 'INT'), ('early', 'INT'), ('email', 'TEXT'), ('name', 'TEXT'), ('email', 'INT')
+    ]
+    assert folded.body[2].table.name == 'teams'
+    assert schema.body[1].columns == original_columns
+
+def test_schema_folder_folds_streamed_statements():
+    folder = SchemaFolder()
+    with open(f'{test_scripts_path}shop_tables.sql') as f:
+        for node in Parser().iter_statements(f):
+            folder.apply(node)
+            if node.type == NodeType.CREATE_TABLE and node.table.name == 'products':
+                assert folder.sql().startswith('CREATE TABLE products (')
+
+    assert folder.sql() == Parser().produce_ast(sql5).fold().sql()
+
+def test_schema_folder_can_drop_data_statements():
+    folder = SchemaFolder(keep_statements=False)
+    for node in Parser().produce_ast(sql5).body:
+        folder.apply(node)
+
+    assert [node.type for node in folder.schema().body] == [NodeType.CREATE_TABLE] * 3
+
+def test_write_sql_streams_the_same_text_as_sql():
+    schema = Parser().produce_ast(sql5).fold()
+    out = io.StringIO()
+
+    schema.write_sql(out)
+
+    assert out.getvalue() == schema.sql()
+    insert = schema.body[3]
+    assert len(list(insert.iter_sql())) == len(insert.values) + 2
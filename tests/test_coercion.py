@@ -0,0 +1,57 @@
+import sys
+import os
+import pytest
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+from abstract_syntax_tree import ColumnDef, ValueRows
+from columnar import export_table
+from coercion import coerce_bools, coerce_column, coerce_rows, coerce_strings, coerce_timestamps
+
+
+def test_strings_are_unquoted_and_unescaped():
+    assert coerce_strings(["'Laptop'", '"Desk Chair"', 'plain']) == ['Laptop', 'Desk Chair', 'plain']
+    schema = Parser().produce_ast("""INSERT INTO t (a) VALUES ("it''s"), ('say ""hi""'), ('a\\nb'), ('c:\\\\tmp');""")
+    assert coerce_strings(schema.body[0].values.cells) == ["it''s", 'say ""hi""', 'a\nb', 'c:\\tmp']
+
+def test_nul_in_strings_keeps_cells_apart():
+    assert coerce_strings(["'p\\0q'", "'r'"]) == ['p\0q', 'r']
+    assert coerce_strings(["'p\0q'", "'r\\n'"]) == ['p\0q', 'r\n']
+
+    schema = Parser().produce_ast("CREATE TABLE t (a TEXT, b INT);\nINSERT INTO t (a, b) VALUES ('p\\0q', 1), ('x\0y', 2), ('r', 3);")
+    table = export_table(schema, 't')
+    assert table['a'].to_list() == ['p\0q', 'x\0y', 'r']
+    assert len(table['a']) == len(table['b']) == 3
+
+def test_booleans_accept_any_case():
+    assert coerce_bools(['true', 'FALSE', 'True', '1', '0']).tolist() == [1, 0, 1, 1, 0]
+    with pytest.raises(ValueError):
+        coerce_bools(['yes'])
+
+def test_timestamps_are_utc_microseconds():
+    cells = ["'1970-01-01 00:00:01'", "'1970-01-01T00:00:01+01:00'", "'1970-01-01 00:00:01'"]
+    assert coerce_timestamps(cells).tolist() == [1_000_000, -3_599_000_000, 1_000_000]
+    # parsing is the stdlib's whether or not numpy is installed
+    assert coerce_timestamps(["'19700101T000002'"]).tolist() == [2_000_000]
+    with pytest.raises(ValueError):
+        coerce_timestamps(["'NaT'"])
+
+def test_rows_are_coerced_by_column_datatype():
+    columns = [ColumnDef(name='id', datatype='INT'), ColumnDef(name='price', datatype='DECIMAL(10,2)'),
+               ColumnDef(name='name', datatype='VARCHAR(64)')]
+    rows = ValueRows(['1', '9.5', "'a'", '2', '0.25', "'b'"], 3)
+
+    columns = coerce_rows(columns, rows)
+
+    assert columns['id'].typecode == 'q' and columns['id'].tolist() == [1, 2]
+    assert columns['price'].tolist() == [950, 25]
+    assert coerce_column('DECIMAL(6,3)', ['-1.5', '.0005', '2e-3', '7']).tolist() == [-1500, 1, 2, 7000]
+    with pytest.raises(ValueError):
+        coerce_column('DECIMAL(6,3)', ['1.2.3'])
+    assert columns['name'] == ['a', 'b']
+    assert coerce_column('TINYINT(1)', ['7']).tolist() == [7]
@@ -0,0 +1,100 @@
+import sys
+import os
+import pytest
+from decimal import Decimal
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+from abstract_syntax_tree import ColumnDef
+from columnar import Column, export_table
+
+
+test_scripts_path = './test_scripts/'
+
+shop_tables = open(f'{test_scripts_path}shop_tables.sql')
+sql5 = shop_tables.read()
+
+
+def test_export_types_columns_from_create_table():
+    schema = Parser().produce_ast(sql5)
+
+    table = export_table(schema, 'products')
+
+    assert len(table) == 3
+    assert table['id'].values.typecode == 'q'
+    assert table['id'].to_list() == [1, 2, 3]
+    assert table['price'].values.tolist() == [99999, 24950, 1299]
+    assert table['price'].to_list() == [Decimal('999.99'), Decimal('249.50'), Decimal('12.99')]
+    assert table['name'].to_list() == ['Laptop', 'Desk Chair', 'Coffee Mug']
+    assert table['name'].offsets.tolist() == [0, 6, 16, 26]
+
+def test_export_booleans_and_timestamps():
+    schema = Parser().produce_ast("""
+        CREATE TABLE events (id INT, active BOOLEAN, at TIMESTAMP);
+        INSERT INTO events (id, active, at) VALUES (1, true, '1970-01-01 00:00:01'), (2, FALSE, '2024-01-01T00:00:00');
+        INSERT INTO events (at, id, active) VALUES ('1970-01-02 00:00:00', 3, true);
+    """)
+
+    table = export_table(schema, 'events')
+
+    assert table['id'].to_list() == [1, 2, 3]
+    assert table['active'].to_list() == [True, False, True]
+    assert table['at'].to_list() == [1_000_000, 1_704_067_200_000_000, 86_400_000_000]
+
+def test_export_of_a_table_without_inserts_has_empty_typed_columns():
+    schema = Parser().produce_ast(sql5 + "CREATE TABLE empty (id INT, price DECIMAL(6,3));")
+
+    table = export_table(schema, 'empty')
+
+    assert list(table.columns) == ['id', 'price']
+    assert len(table) == 0
+    assert table['id'].values.typecode == 'q' and table['price'].scale == 3
+    assert table['price'].to_list() == []
+
+def test_export_rejects_unknown_columns():
+    schema = Parser().produce_ast("""
+        CREATE TABLE events (id INT);
+        INSERT INTO events (name) VALUES ('x');
+    """)
+
+    with pytest.raises(ValueError):
+        export_table(schema, 'events')
+
+EVENTS = """
+    CREATE TABLE events (id INT, name VARCHAR(16), active BOOLEAN, at TIMESTAMP, cost DECIMAL(30,2));
+    INSERT INTO events (id, name, active, at, cost) VALUES (1, 'a', true, '1970-01-01 00:00:01', 0.1), (2, 'bé', FALSE, '20240101T000000', 999.99);
+"""
+
+def test_to_numpy_matches_to_list():
+    numpy = pytest.importorskip('numpy')
+    table = export_table(Parser().produce_ast(EVENTS), 'events')
+
+    arrays = table.to_numpy()
+
+    assert arrays['id'].dtype == numpy.int64 and arrays['id'].tolist() == table['id'].to_list()
+    assert arrays['name'].tolist() == ['a', 'bé']
+    assert arrays['active'].dtype == numpy.bool_ and arrays['active'].tolist() == [True, False]
+    assert arrays['at'].dtype == numpy.dtype('datetime64[us]')
+    assert arrays['at'].astype(numpy.int64).tolist() == table['at'].to_list()
+    assert arrays['cost'].tolist() == [Decimal('0.10'), Decimal('999.99')]
+
+def test_to_arrow_matches_to_list():
+    pyarrow = pytest.importorskip('pyarrow')
+    table = export_table(Parser().produce_ast(EVENTS), 'events')
+
+    arrow = table.to_arrow()
+
+    assert arrow.schema.types == [pyarrow.int64(), pyarrow.large_string(), pyarrow.bool_(),
+                                  pyarrow.timestamp('us', tz='UTC'), pyarrow.decimal128(30, 2)]
+    assert arrow.column('id').to_pylist() == [1, 2]
+    assert arrow.column('name').to_pylist() == ['a', 'bé']
+    assert arrow.column('active').to_pylist() == [True, False]
+    assert arrow.column('at').cast(pyarrow.int64()).to_pylist() == table['at'].to_list()
+    assert arrow.column('cost').to_pylist() == [Decimal('0.10'), Decimal('999.99')]
+    negative = Column(ColumnDef(name='cost', datatype='DECIMAL(30,2)'), ['-999.99', '-0.1', '5'])
+    assert negative.to_arrow().to_pylist() == [Decimal('-999.99'), Decimal('-0.10'), Decimal('5.00')]
@@ -1,5 +1,6 @@
 import sys
 import os
+import pytest
 
 # Get the absolute path to the project root
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -8,7 +9,7 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from lexer import TokenType, Token, tokenize
+from lexer import TokenType, Token, iter_tokens, tokenize, tokenize_bytes, tokenize_file
 
 test_scripts_path = './test_scripts/'
 
@@ -50,3 +51,80 @@ def test_create_table():
     ]
 
     assert_tokens(tokens, expected_tokens)
+
+def test_quoted_literals_and_numbers():
+    tokens = tokenize("UPDATE users SET name = 'Desk Chair' WHERE price = 249.50;")
+
+    expected_tokens = [
+        Token(type=TokenType.KEYWORD, value="UPDATE"),
+        Token(type=TokenType.IDENTIFIER, value="users"),
+        Token(type=TokenType.KEYWORD, value="SET"),
+        Token(type=TokenType.IDENTIFIER, value="name"),
+        Token(type=TokenType.EQUALS, value="="),
+        Token(type=TokenType.LITERAL, value="'Desk Chair'"),
+        Token(type=TokenType.KEYWORD, value="WHERE"),
+        Token(type=TokenType.IDENTIFIER, value="price"),
+        Token(type=TokenType.EQUALS, value="="),
+        Token(type=TokenType.LITERAL, value="249.50"),
+        Token(type=TokenType.DELIMITER, value=";"),
+        Token(type=TokenType.EOF, value="End of File"),
+    ]
+
+    assert_tokens(tokens, expected_tokens)
+
+def test_unclosed_quote_raises():
+    with pytest.raises(Exception, match="Expected closing quote"):
+        tokenize("INSERT INTO users (name) VALUES ('Drew);")
+
+def test_tokens_record_offsets_and_share_word_values():
+    source = "CREATE TABLE users (\n  id INT,\n  parent_id INT\n);"
+    tokens = tokenize(source)
+
+    for token in tokens[:-1]:
+        assert source[token.offset:token.offset + len(token.value)] == token.value
+    assert tokens[-1].offset == len(source)
+
+    ints = [token for token in tokens if token.value == "INT"]
+    assert len(ints) == 2
+    assert ints[0].value is ints[1].value
+
+def test_tokenize_file_matches_tokenize():
+    for script in ['create_table.sql', 'insert_statements.sql', 'shop_tables.sql', 'update_statements.sql']:
+        path = f'{test_scripts_path}{script}'
+        with open(path) as f:
+            expected_tokens = tokenize(f.read())
+
+        assert_tokens(tokenize_file(path), expected_tokens)
+
+def test_tokenize_bytes_uses_byte_offsets():
+    data = "INSERT INTO café (name) VALUES ('crème brûlée');".encode('utf-8')
+    tokens = tokenize_bytes(data)
+
+    assert [token.value for token in tokens[2:4]] == ["café", "("]
+    assert tokens[3].offset == data.index(b"(")
+    assert tokens[-4].value == "'crème brûlée'"
+    assert tokens[-4].offset == data.index(b"'")
+
+def test_non_ascii_runs_split_like_isalpha_and_isdigit():
+    tokens = tokenize("café2² true_x False\tß.5")
+
+    assert [(token.value, token.type) for token in tokens[:-1]] == [
+        ("café", TokenType.IDENTIFIER),
+        ("2²", TokenType.LITERAL),
+        ("true_x", TokenType.IDENTIFIER),
+        ("False", TokenType.LITERAL),
+        ("ß", TokenType.IDENTIFIER),
+        (".5", TokenType.LITERAL),
+    ]
+    with pytest.raises(Exception, match="char encountered: ½"):
+        tokenize("a ½")
+    with pytest.raises(Exception, match="char encountered: \r"):
+        tokenize("a\r\n")
+
+def test_iter_tokens_is_lazy():
+    tokens = iter_tokens("CREATE TABLE users (id INT); @")
+
+    assert next(tokens) == Token(type=TokenType.KEYWORD, value="CREATE")
+    assert [token.value for token in tokenize("a b")] == [token.value for token in iter_tokens("a b")]
+    with pytest.raises(Exception, match="char encountered: @"):
+        list(tokens)
@@ -0,0 +1,99 @@
+import sys
+import os
+import pytest
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from parser import Parser
+from parse_cache import ParseCache
+
+
+test_scripts_path = './test_scripts/'
+
+shop_tables = open(f'{test_scripts_path}shop_tables.sql')
+sql5 = shop_tables.read()
+
+
+def test_second_parse_is_served_from_disk(tmp_path):
+    cache = ParseCache(tmp_path)
+
+    first = cache.produce_ast(sql5)
+    second = ParseCache(tmp_path).produce_ast(sql5)
+
+    assert first == second == Parser().produce_ast(sql5)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+def test_parse_file_is_keyed_by_content(tmp_path):
+    cache = ParseCache(tmp_path)
+    script = tmp_path / 'script.sql'
+    script.write_text(sql5)
+
+    cache.parse_file(script)
+    cache.parse_file(script)
+    script.write_text(sql5 + "\nUPDATE products SET price = 1 WHERE id = 2;")
+    schema = cache.parse_file(script)
+
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(schema.body) == 12
+
+def test_text_and_file_entries_are_kept_apart(tmp_path):
+    # The file lexer reads CRLF like a text-mode read would, while the str
+    # lexer rejects '\r', so the same bytes must not share an entry
+    cache = ParseCache(tmp_path)
+    script = tmp_path / 'script.sql'
+    script.write_bytes(b"INSERT INTO t (a) VALUES ('x\r\ny');\r\n")
+
+    schema = cache.parse_file(script)
+    assert schema.body[0].values.cells == ["'x\ny'"]
+    with pytest.raises(Exception):
+        cache.produce_ast(script.read_bytes().decode('utf-8'))
+    assert cache.parse_file(script) == schema
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_grammar_version_invalidates_entries(tmp_path):
+    class NextParser(Parser):
+        grammar_version = Parser.grammar_version + 1
+
+    ParseCache(tmp_path).produce_ast(sql5)
+    cache = ParseCache(tmp_path, parser=NextParser())
+    cache.produce_ast(sql5)
+
+    assert (cache.hits, cache.misses) == (0, 1)
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParseCache(tmp_path)
+    statements = [f"UPDATE products SET price = {i} WHERE id = 1;" for i in range(3)]
+    cache.produce_ast(statements[0])
+    entry_size = sum(entry.stat().st_size for entry in tmp_path.iterdir())
+
+    cache.max_bytes = entry_size * 2
+    cache.produce_ast(statements[1])
+    cache.produce_ast(statements[0])
+    cache.produce_ast(statements[2])
+
+    assert len(list(tmp_path.iterdir())) == 2
+    assert cache.total_bytes == entry_size * 2
+    cache.produce_ast(statements[0])
+    cache.produce_ast(statements[2])
+    assert cache.hits == 3
+
+def test_opening_the_cache_evicts_by_mtime_and_clears_stale_temp_files(tmp_path):
+    cache = ParseCache(tmp_path)
+    statements = [f"UPDATE products SET price = {i} WHERE id = 1;" for i in range(2)]
+    for statement in statements:
+        cache.produce_ast(statement)
+    kept, evicted = (cache.entry_path(cache.key('text', statement.encode())) for statement in statements)
+    os.utime(evicted, (0, 0))
+    stale = tmp_path / 'dead.tmp'
+    stale.write_bytes(b'x' * 10)
+    os.utime(stale, (0, 0))
+    (tmp_path / 'live.tmp').write_bytes(b'x' * 10)
+
+    reopened = ParseCache(tmp_path, max_bytes=os.path.getsize(kept))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([os.path.basename(kept), 'live.tmp'])
+    assert reopened.total_bytes == os.path.getsize(kept)
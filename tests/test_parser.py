@@ -1,5 +1,7 @@
 import sys
 import os
+import io
+import pytest
 
 # Get the absolute path to the project root
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -9,7 +11,9 @@ if project_root not in sys.path:
 
 
 from parser import Parser
-from abstract_syntax_tree import ColumnDef, CreateTable, Insert, AlterTable, Update
+from lexer import tokenize, split_statements
+from token_stream import TokenStream
+from abstract_syntax_tree import ColumnDef, CreateTable, Insert, AlterTable, NodeType, Table, Update, ValueRows
 
 
 
@@ -255,4 +259,259 @@ def test_shop_tables():
         expected_columns=['is_available'],
         expected_values=["false"],
         expected_conditions=[('category', '=', "'Electronics'")]
-    )
\ No newline at end of file
+    )
+
+def test_named_and_unnamed_foreign_keys():
+    parser = Parser()
+    ast = parser.produce_ast("""
+    CREATE TABLE users (
+      id TINYINT(11) DEFAULT 1 UNIQUE,
+      PRIMARY KEY (id),
+      CONSTRAINT fk_owner FOREIGN KEY (owner_id) REFERENCES owners(id),
+      FOREIGN KEY (team_id) REFERENCES teams(id)
+    );""")
+
+    create = ast.body[0]
+    assert_column(create.columns[0], 'id', 'TINYINT(11)', ["DEFAULT 1", "UNIQUE"])
+    assert create.table_constraints[0].column_name == 'id'
+    assert create.table_constraints[1].name == 'fk_owner'
+    assert create.table_constraints[1].referenced_table == 'owners'
+    assert create.table_constraints[2].name == 'fk_users_team_id'
+    assert create.table_constraints[2].referenced_table == 'teams'
+
+
+def test_choice_backtracks_after_partial_match():
+    parser = Parser()
+    parser.stream = TokenStream(tokenize("price total"))
+
+    result = parser.choice(
+        parser.sequence(parser.identifier(), parser.datatype()),
+        parser.sequence(parser.identifier(), parser.identifier())
+    )(parser)
+
+    assert result == ["price", "total"]
+
+
+def test_unparseable_statement_raises():
+    parser = Parser()
+    with pytest.raises(ValueError):
+        parser.produce_ast("CREATE TABLE users id INT;")
+
+
+def test_grammar_is_built_once_per_class():
+    grammar = Parser.grammar()
+    assert Parser.grammar() is grammar
+    assert grammar['create_table'] is Parser.grammar()['create_table']
+    with pytest.raises(TypeError):
+        grammar['create_table'] = None
+
+    parser = Parser()
+    parser.produce_ast(sql3)
+    assert Parser.grammar() is grammar
+
+
+def test_iter_statements_streams_file_chunks():
+    parser = Parser()
+    expected = Parser().produce_ast(sql5).body
+
+    with open(f'{test_scripts_path}shop_tables.sql') as f:
+        streamed = list(parser.iter_statements(f, chunk_size=7))
+
+    assert streamed == expected
+
+
+def test_split_statements_ignores_quoted_semicolons():
+    chunks = ["INSERT INTO notes (id, body) VALUES (1, 'a;", "b'); UPDATE notes SET body = \"x;y\" WHERE id = 1;\n"]
+
+    statements = list(split_statements(chunks))
+
+    assert statements == [
+        "INSERT INTO notes (id, body) VALUES (1, 'a;b');",
+        " UPDATE notes SET body = \"x;y\" WHERE id = 1;",
+    ]
+    nodes = list(Parser().iter_statements(chunks))
+    assert nodes[0].values[0][1].value == "'a;b'"
+    assert nodes[1].values[0].value == '"x;y"'
+
+
+def test_parse_file_matches_produce_ast():
+    assert Parser().parse_file(f'{test_scripts_path}shop_tables.sql') == Parser().produce_ast(sql5)
+    assert Parser().parse_file(f'{test_scripts_path}update_statements.sql') == Parser().produce_ast(sql4)
+
+
+def test_produce_ast_parallel_keeps_statement_order():
+    expected = Parser().produce_ast(sql5 + sql3).body
+
+    schema = Parser().produce_ast_parallel(sql5 + sql3, max_workers=2, batch_size=200)
+
+    assert schema.body == expected
+
+def test_produce_ast_parallel_passes_parser_options_to_workers():
+    source = sql4 * 3
+    parser = Parser(statement_cache_size=4, profile=True)
+
+    schema = parser.produce_ast_parallel(source, max_workers=1, batch_size=1 << 20)
+
+    assert schema.body == Parser().produce_ast(source).body
+    # repeats are served by the worker's statement cache and never parsed
+    assert (parser.statement_cache.hits, parser.statement_cache.misses) == (2, 1)
+    assert parser.stats.statements['UPDATE'].count == 1
+    assert parser.stats.stages['tokenize'] > 0
+
+
+def test_bulk_insert_stores_rows_compactly():
+    parser = Parser()
+    ast = parser.produce_ast("INSERT INTO orders (order_id, total) VALUES (101, 12.50), (102, 3.99), (103, 7);")
+
+    values = ast.body[0].values
+    assert len(values) == 3
+    assert values.row(1) == ["102", "3.99"]
+    assert values.column(1) == ["12.50", "3.99", "7"]
+    assert values[-1][0].value == "103"
+    assert values == ValueRows.from_rows([["101", "12.50"], ["102", "3.99"], ["103", "7"]])
+
+
+def test_bulk_insert_rejects_mismatched_rows():
+    parser = Parser()
+    with pytest.raises(Exception, match="mismatched lengths"):
+        parser.produce_ast("INSERT INTO orders (order_id, total) VALUES (101, 12.50), (102);")
+    with pytest.raises(ValueError):
+        parser.produce_ast("INSERT INTO orders (order_id, total) VALUES (101, 12.50),;")
+
+
+def test_statement_cache_skips_repeated_statements():
+    parser = Parser(statement_cache_size=2)
+    source = sql4 + "\nUPDATE  users\n\tSET name = 'Drew'  WHERE id = 1;" + sql4.replace("'Drew'", "'Drew  '")
+
+    ast = parser.produce_ast(source)
+
+    assert len(ast.body) == 3
+    assert ast.body[0] == ast.body[1]
+    assert ast.body[0] is not ast.body[1]
+    assert ast.body[2].values[0].value == "'Drew  '"
+    assert (parser.statement_cache.hits, parser.statement_cache.misses) == (1, 2)
+    assert ast == Parser().produce_ast(source)
+
+def test_statement_cache_skips_long_statements():
+    parser = Parser(statement_cache_size=8)
+    parser.statement_cache.max_statement_length = len(sql4) - 1
+
+    ast = parser.produce_ast(sql4 + sql4 + "UPDATE users SET name = 'x' WHERE id = 1;")
+
+    assert ast == Parser().produce_ast(sql4 + sql4 + "UPDATE users SET name = 'x' WHERE id = 1;")
+    assert parser.statement_cache.skipped == 2
+    assert (parser.statement_cache.hits, parser.statement_cache.misses) == (0, 1)
+    assert len(parser.statement_cache) == 1
+
+def test_statement_cache_hits_are_not_shared():
+    parser = Parser(statement_cache_size=8)
+    source = "CREATE TABLE a (id INT);\nALTER TABLE a ADD COLUMN b INT;"
+    expected = parser.produce_ast(source).sql()
+
+    schema = parser.produce_ast(source)
+    schema.body[0].columns.append(ColumnDef(name='x', datatype='INT'))
+    schema.fold().body[0].columns[-1].datatype = 'TEXT'
+
+    assert parser.produce_ast(source).sql() == expected
+    assert parser.produce_ast(source).fold().body[0].columns[-1].datatype == 'INT'
+    assert parser.statement_cache.hits == 6
+
+
+def test_profiling_records_stages_and_statements():
+    parser = Parser(profile=True)
+    schema = parser.produce_ast(sql5)
+    schema.fold(parser.stats)
+    schema.sql(parser.stats)
+
+    stats = parser.stats.to_dict()
+
+    assert set(stats['stages']) == {'tokenize', 'parse', 'fold', 'sql'}
+    assert stats['statements']['CREATE_TABLE']['count'] == 3
+    assert stats['statements']['INSERT']['count'] == sum(1 for node in schema.body if node.type.name == 'INSERT')
+    assert stats['tokens'] == len(tokenize(sql5)) - 1
+    assert stats['combinator_calls']['sequence'] > 0
+    assert stats['backtracks'] == 0
+    assert any(line.startswith('parse;CREATE_TABLE;grammar ') for line in parser.stats.folded_stacks())
+    assert Parser().produce_ast(sql5) == schema
+    assert Parser().stats is None
+
+    with pytest.raises(ValueError):
+        parser.produce_ast("INSERT INTO users (id) VALUES (1), (2;")
+    assert parser.stats.backtracks == 1
+    assert parser.stats.statements['FAILED'].count == 1
+
+def test_profiling_counts_statements_that_raise():
+    parser = Parser(profile=True)
+    failing = [
+        "DROP TABLE users;",
+        "INSERT INTO orders (order_id, total) VALUES (101, 12.50), (102);",
+        "UPDATE users SET name = 'x WHERE id = 1;",
+    ]
+
+    for source in failing:
+        with pytest.raises(Exception):
+            parser.produce_ast(source)
+
+    assert parser.stats.statements['FAILED'].count == 3
+
+def test_profiled_grammar_is_built_before_the_first_statement():
+    class FreshParser(Parser):
+        pass
+
+    parser = FreshParser(profile=True)
+
+    assert '_profiled_grammar' in FreshParser.__dict__
+
+
+def test_registered_statement_handlers_dispatch_on_leading_tokens():
+    class DropTableParser(Parser):
+        def parse_drop_table(self):
+            self.next()
+            self.next()
+            table = Table(name=self.next().value)
+            self.next()
+            return table
+
+    DropTableParser.register_statement('DROP', DropTableParser.parse_drop_table, second='TABLE')
+
+    schema = DropTableParser().produce_ast("DROP TABLE users; UPDATE users SET name = 'a' WHERE id = 1;")
+
+    assert schema.body[0] == Table(name='users')
+    assert isinstance(schema.body[1], Update)
+    assert 'DROP' not in Parser.statement_handlers
+    with pytest.raises(ValueError, match="Unexpected token"):
+        DropTableParser().produce_ast("DROP COLUMN users;")
+
+
+def test_resilient_parse_skips_bad_statements():
+    source = (
+        "CREATE TABLE users (id INT);\n"
+        "CREATE INDEX idx ON users (id);\n"
+        "INSERT INTO users (id) VALUES (1, 2);\n"
+        "  UPDATE users SET id = 2 WHERE id @ 1;\n"
+        "INSERT INTO users (id) VALUES (3);\n"
+        "DELETE FROM users"
+    )
+
+    schema, errors = Parser().produce_ast_resilient(io.StringIO(source))
+
+    assert [node.type for node in schema.body] == [NodeType.CREATE_TABLE, NodeType.INSERT]
+    assert schema.body[1].values.cells == ['3']
+    assert [error.line for error in errors] == [2, 3, 4, 6]
+    assert [source[error.offset:error.offset + 6] for error in errors] == ['CREATE', 'INSERT', 'UPDATE', 'DELETE']
+    assert errors[1].message == "Columns and values have mismatched lengths"
+    assert errors[2].message == "Unexpected non-digit, non-alpha char encountered: @"
+
+def test_resilient_parse_resyncs_after_a_quote_it_cannot_pair():
+    good = "".join(f"INSERT INTO users (id, name) VALUES ({i}, 'u');\n" for i in range(4))
+    source = (
+        "INSERT INTO users (id, name) VALUES (1, 'O\\'Brien');\n" + good +
+        "INSERT INTO users (id, name) VALUES (5, 'oops);\n" + good
+    )
+
+    for chunk_size in (1 << 16, 7):
+        schema, errors = Parser().produce_ast_resilient(io.StringIO(source), chunk_size=chunk_size)
+
+        assert [node.values.cells for node in schema.body] == [[str(i), "'u'"] for i in range(4)] * 2
+        assert [error.line for error in errors] == [1, 6]
+        assert [source[error.offset:error.offset + 6] for error in errors] == ['INSERT', 'INSERT']
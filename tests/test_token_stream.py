@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lexer import TokenType, iter_tokens, tokenize
+from token_stream import TokenStream
+from base_parser import BaseParser
+
+
+def test_mark_and_rewind():
+    stream = TokenStream(tokenize("ALTER TABLE users;"))
+    start = stream.mark()
+    assert stream.advance().value == "ALTER"
+    assert stream.advance().value == "TABLE"
+    assert stream.curr().value == "users"
+
+    stream.rewind(start)
+    assert stream.curr().value == "ALTER"
+    assert len(stream) == 5
+
+def test_eof_is_sticky():
+    stream = TokenStream(tokenize("users"))
+    stream.advance()
+    assert stream.advance().type == TokenType.EOF
+    assert stream.curr().type == TokenType.EOF
+
+def test_many_leaves_trailing_separator():
+    parser = BaseParser()
+    parser.stream = TokenStream(tokenize("a, b, ;"))
+
+    result = parser.many(parser.identifier(), parser.delimiter(","))(parser)
+
+    assert result == ["a", "b"]
+    assert parser.curr_value() == ","
+
+def test_streamed_tokens_are_buffered_lazily_and_released():
+    stream = TokenStream(iter_tokens("ALTER TABLE users; DROP x;"))
+    assert len(stream.tokens) == 0
+
+    assert stream.curr().value == "ALTER"
+    assert stream.peek(2).value == "users"
+    assert len(stream.tokens) == 3
+
+    start = stream.mark()
+    for _ in range(4):
+        stream.advance()
+    stream.rewind(start)
+    assert stream.curr().value == "ALTER"
+
+    for _ in range(4):
+        stream.advance()
+    stream.release()
+    assert len(stream.tokens) == 0
+    assert stream.curr().value == "DROP"
+    assert stream.fill_statement()[-1].value == ";"
+    assert stream.peek(10).type == TokenType.EOF
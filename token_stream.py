@@ -0,0 +1,83 @@
+from typing import Iterable, Iterator
+from lexer import Token, TokenType
+
+
+class TokenStream:
+    # Reads from a token list, or lazily from any token iterator (e.g.
+    # iter_tokens) through a lookahead buffer. Tokens are pulled into the
+    # buffer only when the parser reaches them, and release() drops the
+    # consumed ones, so a streamed parse keeps about one statement alive.
+    def __init__(self, tokens: Iterable[Token]):
+        if isinstance(tokens, list):
+            self.tokens = tokens
+            self.source: Iterator[Token] | None = None
+        else:
+            self.tokens = []
+            self.source = iter(tokens)
+        self.pos = 0
+
+    def curr(self) -> Token:
+        try:
+            return self.tokens[self.pos]
+        except IndexError:
+            self.fill(self.pos + 1)
+            return self.tokens[self.pos]
+
+    def advance(self) -> Token:
+        token = self.curr()
+        # EOF is sticky so lookahead past the end keeps returning it
+        if token.type != TokenType.EOF:
+            self.pos += 1
+        return token
+
+    def peek(self, offset: int = 1) -> Token:
+        # The token offset places after the current one; EOF past the end
+        index = self.pos + offset
+        if index >= len(self.tokens):
+            self.fill(index + 1)
+        return self.tokens[min(index, len(self.tokens) - 1)]
+
+    def fill(self, size: int):
+        # Grows the buffer to size tokens, or until the source runs out
+        source = self.source
+        if source is None:
+            return
+        tokens = self.tokens
+        for token in source:
+            tokens.append(token)
+            if len(tokens) >= size:
+                return
+        self.source = None
+
+    def fill_statement(self) -> list[Token]:
+        # Buffers through the next ';' (or EOF) so hot loops can index the
+        # current statement's tokens directly
+        source = self.source
+        tokens = self.tokens
+        if source is None:
+            return tokens
+        for token in tokens[self.pos:]:
+            if token.value == ';' and token.type == TokenType.DELIMITER:
+                return tokens
+        for token in source:
+            tokens.append(token)
+            if token.type == TokenType.DELIMITER and token.value == ';':
+                return tokens
+        self.source = None
+        return tokens
+
+    def release(self):
+        # Forgets the tokens before the current one. Every mark taken so far
+        # becomes invalid, so this is only called between statements.
+        if self.source is not None and self.pos:
+            del self.tokens[:self.pos]
+            self.pos = 0
+
+    def mark(self) -> int:
+        return self.pos
+
+    def rewind(self, mark: int):
+        self.pos = mark
+
+    def __len__(self) -> int:
+        return len(self.tokens) - self.pos